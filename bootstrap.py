@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Idempotent local setup shared by start.sh and start.bat:
+creates the data directories and seeds .env from the template
+"""
+
+import os
+import shutil
+
+DIRECTORIES = ("uploads", "data", "logs")
+
+def main():
+    if not os.path.exists(".env") and os.path.exists(".env.template"):
+        print("📝 Creating environment file...")
+        shutil.copyfile(".env.template", ".env")
+        print("✅ Created .env file from template")
+        print("💡 You can edit .env to add your OpenAI API key (optional)")
+
+    print("📁 Creating directories...")
+    for directory in DIRECTORIES:
+        os.makedirs(directory, exist_ok=True)
+    print("✅ Directories created")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,122 @@
 import fitz  # PyMuPDF
 import docx
+import aiofiles
+import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from langchain.text_splitters import RecursiveCharacterTextSplitter
 
+# Every PyMuPDF call runs in a worker process; PyMuPDF is not thread-safe
+# and page text assembly would otherwise hold the GIL
+PROCESS_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+def _pdf_page_count(file_path: str) -> int:
+    """Number of pages in a PDF"""
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> str:
+    """Extract the text of pages [start, stop), run inside a worker process"""
+    with fitz.open(file_path) as doc:
+        return "\n".join(doc[page_num].get_text("text") for page_num in range(start, stop)) + "\n"
+
+
+def _overlap_length(previous: str, following: str, max_overlap: int) -> int:
+    """Length of the longest suffix of previous that starts following"""
+    for size in range(min(len(previous), len(following), max_overlap), 0, -1):
+        if previous.endswith(following[:size]):
+            return size
+    return 0
+
+
+def fast_split(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Split a short text at the latest paragraph, line or word break per window"""
+    chunks: List[str] = []
+    start, length = 0, len(text)
+
+    while start < length:
+        end = start + chunk_size
+        if end >= length:
+            chunks.append(text[start:].strip())
+            break
+
+        # Prefer breaks in the second half of the window so chunks stay full
+        cut = -1
+        for separator in ("\n\n", "\n", " "):
+            cut = text.rfind(separator, start + chunk_size // 2, end)
+            if cut != -1:
+                break
+        if cut <= start:
+            cut = text.rfind(" ", start + 1, end)
+        if cut <= start:
+            cut = end
+
+        chunks.append(text[start:cut].strip())
+
+        # Step back by the overlap, aligned to the start of a word; a cut in
+        # the first half (before a long unbreakable run) moves on without it,
+        # otherwise each pass would advance by only one word
+        next_start = cut
+        if chunk_overlap and cut >= start + chunk_size // 2:
+            space = text.find(" ", cut - chunk_overlap, cut)
+            if space != -1:
+                next_start = space + 1
+        start = max(next_start, start + 1)
+
+    return [chunk for chunk in chunks if chunk]
+
+
+def merge_small(chunks: List[str], min_size: int, max_size: int, overlap: int = 0) -> List[str]:
+    """Greedily merge adjacent undersized chunks without exceeding max_size"""
+    merged: List[str] = []
+
+    for chunk in chunks:
+        if merged and (len(merged[-1]) < min_size or len(chunk) < min_size):
+            # Drop the overlap the splitter repeated at the start of this chunk
+            shared = _overlap_length(merged[-1], chunk, overlap)
+            joined = merged[-1] + chunk[shared:] if shared else merged[-1] + "\n" + chunk
+            if len(joined) <= max_size:
+                merged[-1] = joined
+                continue
+        merged.append(chunk)
+
+    return merged
+
+
+def resplit_oversized(chunks: List[str],
+                      hard_cap: int,
+                      splitter: RecursiveCharacterTextSplitter,
+                      overlap: int = 0) -> List[str]:
+    """Re-split chunks above hard_cap, hard-slicing when no separator helps"""
+    result: List[str] = []
+    step = max(1, hard_cap - overlap)
+
+    for chunk in chunks:
+        if len(chunk) <= hard_cap:
+            result.append(chunk)
+            continue
+
+        for piece in splitter.split_text(chunk):
+            if len(piece) <= hard_cap:
+                result.append(piece)
+            else:
+                # Strict chunk size: no separator found, fall back to slicing
+                result.extend(piece[i:i + hard_cap] for i in range(0, len(piece), step))
+
+    return result
+
 class DocumentProcessor:
     """Handles document processing and text extraction for various file formats"""
 
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.pdf_pages_per_task = 16
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -25,77 +131,137 @@ class DocumentProcessor:
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        # Extract text based on file type
+        # Extract and split text based on file type
         if file_path.suffix.lower() == '.pdf':
-            text = await self._extract_text_from_pdf(str(file_path))
-        elif file_path.suffix.lower() == '.docx':
-            text = await self._extract_text_from_docx(str(file_path))
-        elif file_path.suffix.lower() in ['.txt', '.md']:
-            text = await self._extract_text_from_txt(str(file_path))
+            # PDF pages are streamed into the splitter without building one big string
+            chunks = await self._split_pdf(str(file_path))
         else:
-            raise ValueError(f"Unsupported file format: {file_path.suffix}")
+            if file_path.suffix.lower() == '.docx':
+                text = await self._extract_text_from_docx(str(file_path))
+            elif file_path.suffix.lower() in ['.txt', '.md']:
+                text = await self._extract_text_from_txt(str(file_path))
+            else:
+                raise ValueError(f"Unsupported file format: {file_path.suffix}")
+
+            if not text.strip():
+                raise ValueError("No text content found in document")
+
+            # Splitting is CPU-bound, so keep it off the event loop
+            chunks = await asyncio.to_thread(self._split_text, text)
 
-        if not text.strip():
+        if not chunks:
             raise ValueError("No text content found in document")
 
-        # Split text into chunks
-        chunks = self.text_splitter.split_text(text)
+        return await asyncio.to_thread(self._build_chunks, chunks)
+
+    def _build_chunks(self, chunks: List[str]) -> List[Dict[str, Any]]:
+        """Normalize chunk sizes and attach metadata"""
+
+        # Merge fragments and re-split oversized chunks
+        chunks = merge_small(chunks,
+                             min_size=self.chunk_size // 4,
+                             max_size=self.chunk_size,
+                             overlap=self.chunk_overlap)
+        chunks = resplit_oversized(chunks,
+                                   hard_cap=int(self.chunk_size * 1.15),
+                                   splitter=self.text_splitter,
+                                   overlap=self.chunk_overlap)
 
-        # Create chunk objects with metadata
-        chunk_objects = []
-        for i, chunk in enumerate(chunks):
-            if chunk.strip():  # Only include non-empty chunks
-                chunk_objects.append({
-                    'content': chunk.strip(),
-                    'chunk_id': i,
-                    'char_count': len(chunk),
-                    'word_count': len(chunk.split()),
-                })
+        # Create chunk objects with metadata, stripping each chunk only once
+        stripped = ((i, chunk.strip()) for i, chunk in enumerate(chunks))
+        chunk_objects = [
+            {
+                'content': content,
+                'chunk_id': i,
+                'char_count': len(content),
+                'word_count': len(content.split()),
+            }
+            for i, content in stripped
+            if content  # Only include non-empty chunks
+        ]
 
         return chunk_objects
 
-    async def _extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF using PyMuPDF"""
+    def _split_text(self, text: str) -> List[str]:
+        """Split text, bypassing the recursive splitter for short inputs"""
+        if len(text) <= 2 * self.chunk_size:
+            return fast_split(text, self.chunk_size, self.chunk_overlap)
+        return self.text_splitter.split_text(text)
+
+    async def _split_pdf(self, file_path: str) -> List[str]:
+        """Extract text from PDF using PyMuPDF and split it into chunks"""
         try:
-            doc = fitz.open(file_path)
-            text = ""
+            loop = asyncio.get_event_loop()
+            # fitz never runs on a thread, so concurrent uploads cannot share it
+            page_count = await loop.run_in_executor(PROCESS_POOL, _pdf_page_count, file_path)
+
+            step = self.pdf_pages_per_task
+            ranges = iter([(start, min(start + step, page_count)) for start in range(0, page_count, step)])
 
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                text += page.get_text() + "\n"
+            def submit(page_range: Tuple[int, int]):
+                return loop.run_in_executor(PROCESS_POOL, _extract_pdf_pages, file_path, *page_range)
 
-            doc.close()
-            return text
+            # Keep a bounded number of page ranges in flight and consume them in order
+            in_flight = 2 * (os.cpu_count() or 1)
+            pending = deque(submit(page_range) for _, page_range in zip(range(in_flight), ranges))
+
+            chunks: List[str] = []
+            buffer = ""
+            while pending:
+                text = await pending.popleft()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append(submit(next_range))
+
+                finished, buffer = await asyncio.to_thread(self._feed_pdf_text, buffer, text)
+                chunks.extend(finished)
+
+            if buffer.strip():
+                chunks.extend(await asyncio.to_thread(self._split_text, buffer))
+            return chunks
 
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
 
+    def _feed_pdf_text(self, buffer: str, text: str) -> Tuple[List[str], str]:
+        """Append page text to the carry-over buffer, returning finished chunks"""
+        buffer += text
+        if len(buffer) <= self.chunk_size * 4:
+            return [], buffer
+
+        pieces = self.text_splitter.split_text(buffer)
+        if not pieces:
+            return [], ""
+        # The last piece may continue on the next page, so carry it over
+        return pieces[:-1], pieces[-1] + "\n"
+
     async def _extract_text_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
         try:
-            doc = docx.Document(file_path)
-            text = ""
+            # python-docx XML parsing is CPU-bound, so keep it off the event loop
+            return await asyncio.to_thread(self._read_docx, file_path)
 
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+        except Exception as e:
+            raise Exception(f"Error extracting text from DOCX: {str(e)}")
 
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
+    @staticmethod
+    def _read_docx(file_path: str) -> str:
+        """Collect paragraph and table text, joined once"""
+        doc = docx.Document(file_path)
+        parts = [paragraph.text for paragraph in doc.paragraphs]
 
-            return text
+        # Extract text from tables, one line per row
+        for table in doc.tables:
+            for row in table.rows:
+                parts.append(" ".join(cell.text for cell in row.cells))
 
-        except Exception as e:
-            raise Exception(f"Error extracting text from DOCX: {str(e)}")
+        return "\n".join(parts)
 
     async def _extract_text_from_txt(self, file_path: str) -> str:
         """Extract text from TXT/MD file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
+                return await file.read()
 
         except Exception as e:
             raise Exception(f"Error extracting text from TXT: {str(e)}")
@@ -105,8 +271,11 @@ class DocumentProcessor:
         if not chunks:
             return {}
 
-        total_chars = sum(chunk['char_count'] for chunk in chunks)
-        total_words = sum(chunk['word_count'] for chunk in chunks)
+        # Single pass over the chunks for both totals
+        total_chars = total_words = 0
+        for chunk in chunks:
+            total_chars += chunk['char_count']
+            total_words += chunk['word_count']
 
         return {
             'total_chunks': len(chunks),
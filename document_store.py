@@ -0,0 +1,90 @@
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import List, Dict, Any, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class DocumentStore:
+    """SQLite storage for uploaded documents and their chunks"""
+
+    def __init__(self, db_path: str = "data/documents.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # One shared connection; writes are serialized by the lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = Lock()
+
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    upload_time TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL,
+                    status TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    doc_id TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    source TEXT
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks (doc_id)")
+
+        logger.info(f"Opened document store at {db_path}")
+
+    def add_document(self, document: Dict[str, Any], chunks: List[Dict[str, Any]]):
+        """Insert a document and its processed chunks in one transaction"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO documents (id, filename, upload_time, chunk_count, status) "
+                "VALUES (:id, :filename, :upload_time, :chunk_count, :status)",
+                document
+            )
+            # Rows are built straight from the chunk dicts, without merged copies
+            self.conn.executemany(
+                "INSERT INTO chunks (doc_id, chunk_id, content, source) VALUES (?, ?, ?, ?)",
+                ((document['id'], chunk['chunk_id'], chunk['content'], document['filename'])
+                 for chunk in chunks)
+            )
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document by id"""
+        row = self.conn.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """List all documents in upload order"""
+        rows = self.conn.execute("SELECT * FROM documents ORDER BY upload_time").fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_document(self, doc_id: str):
+        """Delete a document and its chunks"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def has_chunks(self) -> bool:
+        """Whether any chunk is stored"""
+        return self.conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone() is not None
+
+    def count_documents(self) -> int:
+        """Number of stored documents"""
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def count_chunks(self) -> int:
+        """Number of stored chunks"""
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
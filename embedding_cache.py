@@ -0,0 +1,75 @@
+import sqlite3
+import hashlib
+from pathlib import Path
+from threading import Lock
+from typing import List, Dict, Tuple
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """SQLite store of chunk embeddings keyed by SHA-256 of the chunk text"""
+
+    # Stay below SQLite's default limit on bound parameters per statement
+    _QUERY_BATCH = 500
+
+    def __init__(self, db_path: str, model_name: str, dimension: int = 384):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.dimension = dimension
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = Lock()
+
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # Embeddings from different models are never mixed up
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, key)
+                )
+            """)
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Cache key for a chunk text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached embeddings for the keys that are present"""
+        found = {}
+        for start in range(0, len(keys), self._QUERY_BATCH):
+            batch = keys[start:start + self._QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                [self.model_name, *batch]
+            ).fetchall()
+
+            for key, vector in rows:
+                embedding = np.frombuffer(vector, dtype=np.float32)
+                if len(embedding) == self.dimension:
+                    found[key] = embedding
+        return found
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]):
+        """Store embeddings for the given keys"""
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+                    [(self.model_name, key, np.ascontiguousarray(embedding, dtype=np.float32).tobytes())
+                     for key, embedding in items]
+                )
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {str(e)}")
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
@@ -1,14 +1,24 @@
 import os
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, AsyncIterator
+from functools import lru_cache
 import asyncio
 import logging
 import openai
 from openai import AsyncOpenAI
+from rank_bm25 import BM25Okapi
 import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=4096)
+def _sentence_index(chunk: str) -> Tuple[Tuple[str, ...], Optional[BM25Okapi]]:
+    """Split a chunk into sentences and build a BM25 index over their words"""
+    sentences = tuple(sentence for sentence in (s.strip() for s in chunk.split('.')) if sentence)
+    if not sentences:
+        return sentences, None
+    return sentences, BM25Okapi([sentence.lower().split() for sentence in sentences])
+
 class LLMService:
     """Service for generating responses using Large Language Models"""
 
@@ -27,8 +37,9 @@ class LLMService:
 
     async def generate_response(self, 
                               query: str, 
-                              context_chunks: List[Tuple[str, Dict[str, Any], float]]) -> str:
-        """Generate a response based on query and retrieved context"""
+                              context_chunks: List[Tuple[str, Dict[str, Any], float]],
+                              max_chars: Optional[int] = None) -> str:
+        """Generate a response based on query and retrieved context, up to about max_chars"""
 
         if not context_chunks:
             return "I couldn't find relevant information to answer your question."
@@ -37,10 +48,36 @@ class LLMService:
         context = self._prepare_context(context_chunks)
 
         if self.use_openai:
-            return await self._generate_openai_response(query, context)
+            return await self._generate_openai_response(query, context, self._max_tokens(max_chars))
         else:
             return await self._generate_fallback_response(query, context, context_chunks)
 
+    async def generate_response_stream(self,
+                                       query: str,
+                                       context_chunks: List[Tuple[str, Dict[str, Any], float]]) -> AsyncIterator[str]:
+        """Yield the response incrementally as the model produces it"""
+
+        if not context_chunks:
+            yield "I couldn't find relevant information to answer your question."
+            return
+
+        context = self._prepare_context(context_chunks)
+
+        if self.use_openai:
+            async for token in self._stream_openai_response(query, context):
+                yield token
+        else:
+            yield await self._generate_fallback_response(query, context, context_chunks)
+
+    @staticmethod
+    def _max_tokens(max_chars: Optional[int]) -> int:
+        """Completion token budget for an answer of max_chars characters"""
+        if max_chars is None:
+            return 500
+        # English averages about four characters per token; budget for three
+        # so the answer rarely stops short of the cap
+        return min(500, max(1, -(-max_chars // 3)))
+
     def _prepare_context(self, context_chunks: List[Tuple[str, Dict[str, Any], float]]) -> str:
         """Prepare context string from retrieved chunks"""
 
@@ -53,8 +90,8 @@ class LLMService:
 
         return "\n".join(context_parts)
 
-    async def _generate_openai_response(self, query: str, context: str) -> str:
-        """Generate response using OpenAI API"""
+    def _build_messages(self, query: str, context: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a query and its context"""
 
         system_prompt = """You are a helpful AI assistant that answers questions based on provided context. 
 
@@ -73,15 +110,20 @@ Question: {query}
 
 Please provide a detailed answer based on the context above."""
 
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    async def _generate_openai_response(self, query: str, context: str, max_tokens: int = 500) -> str:
+        """Generate response using OpenAI API"""
+
         try:
             response = await self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._build_messages(query, context),
                 temperature=0.3,
-                max_tokens=500
+                max_tokens=max_tokens
             )
 
             return response.choices[0].message.content.strip()
@@ -90,6 +132,27 @@ Please provide a detailed answer based on the context above."""
             logger.error(f"OpenAI API error: {str(e)}")
             return f"Sorry, I encountered an error generating the response: {str(e)}"
 
+    async def _stream_openai_response(self, query: str, context: str) -> AsyncIterator[str]:
+        """Stream response tokens from the OpenAI API as they arrive"""
+
+        try:
+            stream = await self.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=self._build_messages(query, context),
+                temperature=0.3,
+                max_tokens=500,
+                stream=True
+            )
+
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    yield token
+
+        except Exception as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            yield f"Sorry, I encountered an error generating the response: {str(e)}"
+
     async def _generate_fallback_response(self, 
                                         query: str, 
                                         context: str, 
@@ -103,17 +166,19 @@ Please provide a detailed answer based on the context above."""
         if context_chunks:
             best_chunk, best_metadata, best_score = context_chunks[0]
 
-            # Extract key sentences from the best chunk
-            sentences = [s.strip() for s in best_chunk.split('.') if s.strip()]
-
-            # Find sentences that contain query keywords
-            query_words = set(query_lower.split())
+            # Rank sentences containing query keywords with BM25 (indexed once per chunk)
+            query_tokens = query_lower.split()
+            query_words = frozenset(query_tokens)
+            sentences, bm25 = _sentence_index(best_chunk)
             relevant_sentences = []
 
-            for sentence in sentences:
-                sentence_words = set(sentence.lower().split())
-                if query_words.intersection(sentence_words):
-                    relevant_sentences.append(sentence)
+            if bm25 is not None and query_tokens:
+                scores = bm25.get_scores(query_tokens)
+                matched = [i for i, term_freqs in enumerate(bm25.doc_freqs)
+                           if not query_words.isdisjoint(term_freqs)]
+                # Best three matches, kept in document order
+                top = sorted(sorted(matched, key=lambda i: scores[i], reverse=True)[:3])
+                relevant_sentences = [sentences[i] for i in top]
 
             if relevant_sentences:
                 response = "Based on the available information:\n\n"
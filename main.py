@@ -1,11 +1,11 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 import uuid
-import json
+import orjson
+import aiofiles
 from pathlib import Path
 import asyncio
 from datetime import datetime
@@ -14,35 +14,76 @@ from datetime import datetime
 from document_processor import DocumentProcessor
 from vector_store import VectorStore
 from llm_service import LLMService
+from semantic_cache import SemanticCache
+from document_store import DocumentStore
 
 app = FastAPI(
     title="RAG Knowledge Base API",
     description="Intelligent document search with Retrieval-Augmented Generation",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+class StaticCORSMiddleware:
+    """Raw ASGI middleware adding fixed allow-all CORS headers to every response"""
+
+    headers = [
+        (b"access-control-allow-origin", b"*"),
+        (b"access-control-allow-methods", b"*"),
+        (b"access-control-allow-headers", b"*"),
+    ]
+    preflight_headers = headers + [(b"access-control-max-age", b"600"), (b"content-length", b"0")]
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Answer preflight requests directly
+        if scope["method"] == "OPTIONS" and any(
+                name == b"access-control-request-method" for name, _ in scope["headers"]):
+            await send({"type": "http.response.start", "status": 200, "headers": self.preflight_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + self.headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
 # CORS middleware for frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(StaticCORSMiddleware)
 
 # Initialize services
 doc_processor = DocumentProcessor()
-vector_store = VectorStore()
+# Vectors live next to the document database so both persist on the same volume
+vector_store = VectorStore(
+    index_path=os.getenv("VECTOR_INDEX_PATH") or "data/vector_index.faiss",
+    metadata_path=os.getenv("VECTOR_METADATA_PATH") or "data/vector_metadata.jsonl",
+    index_type=os.getenv("VECTOR_INDEX_TYPE", "hnsw"),
+    onnx_model_path=os.getenv("EMBEDDING_ONNX_PATH") or None,
+    embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH") or "data/embeddings.db"
+)
 llm_service = LLMService()
+semantic_cache = SemanticCache(dimension=vector_store.dimension, ttl_seconds=600)
+document_store = DocumentStore(os.getenv("DOCUMENT_DB_PATH", "data/documents.db"))
 
 # Create upload directory
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE_MB", "50")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB per read/write
 
 # Data models
 class QueryRequest(BaseModel):
     query: str
     top_k: Optional[int] = 5
+    max_chars: Optional[int] = Field(None, ge=1)  # Cap the answer length
 
 class QueryResponse(BaseModel):
     response: str
@@ -57,9 +98,37 @@ class DocumentInfo(BaseModel):
     chunk_count: int
     status: str
 
-# In-memory storage for demo (use real database in production)
-documents_db = {}
-chunks_db = []
+def format_sources(relevant_chunks) -> List[dict]:
+    """Format retrieved chunks as source entries for API responses"""
+    sources = []
+    for chunk_text, metadata, score in relevant_chunks:
+        sources.append({
+            "source": metadata.get('source', 'Unknown'),
+            "chunk_id": metadata.get('chunk_id', 0),
+            "relevance_score": round(float(score), 3),
+            "content_preview": chunk_text[:200] + "..." if len(chunk_text) > 200 else chunk_text
+        })
+    return sources
+
+def query_result(response: str,
+                 sources: List[dict],
+                 query: str,
+                 max_chars: Optional[int] = None) -> ORJSONResponse:
+    """Serialize a query result directly, skipping response model validation"""
+    if max_chars is not None and len(response) > max_chars:
+        response = response[:max_chars]
+    return ORJSONResponse({
+        "response": response,
+        "sources": sources,
+        "query": query,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Persist vectors added since the last snapshot"""
+    vector_store.close()
+    document_store.close()
 
 @app.get("/")
 async def root():
@@ -79,47 +148,58 @@ async def upload_document(file: UploadFile = File(...)):
             detail=f"Unsupported file format. Allowed: {', '.join(allowed_extensions)}"
         )
 
+    # Reject oversized uploads before copying them
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)} MB")
+
     try:
         # Generate unique document ID
         doc_id = str(uuid.uuid4())
 
-        # Save uploaded file
+        # Stream uploaded file to disk without holding it in memory
         file_path = UPLOAD_DIR / f"{doc_id}_{file.filename}"
-        content = await file.read()
-
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
+        written = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > MAX_FILE_SIZE:
+                    break
+                await buffer.write(chunk)
+
+        if written > MAX_FILE_SIZE:
+            file_path.unlink()
+            raise HTTPException(status_code=413, detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)} MB")
 
         # Process document
         chunks = await doc_processor.process_document(str(file_path))
 
-        # Add chunks to vector store
-        texts = [chunk['content'] for chunk in chunks]
-        metadatas = [{
-            'doc_id': doc_id,
-            'chunk_id': chunk['chunk_id'],
-            'source': file.filename,
-            'file_path': str(file_path)
-        } for chunk in chunks]
+        # Add chunks to vector store, building texts and metadata in one pass
+        source, stored_path = file.filename, str(file_path)
+        texts, metadatas = [], []
+        for chunk in chunks:
+            texts.append(chunk['content'])
+            metadatas.append({
+                'doc_id': doc_id,
+                'chunk_id': chunk['chunk_id'],
+                'source': source,
+                'file_path': stored_path
+            })
 
         await vector_store.add_documents(texts, metadatas)
-
-        # Store document info
-        documents_db[doc_id] = DocumentInfo(
-            id=doc_id,
-            filename=file.filename,
-            upload_time=datetime.now().isoformat(),
-            chunk_count=len(chunks),
-            status="processed"
+        semantic_cache.invalidate()
+
+        # Store document info and chunks for reference
+        document_store.add_document(
+            {
+                'id': doc_id,
+                'filename': file.filename,
+                'upload_time': datetime.now().isoformat(),
+                'chunk_count': len(chunks),
+                'status': "processed"
+            },
+            chunks
         )
 
-        # Store chunks for reference
-        for chunk, metadata in zip(chunks, metadatas):
-            chunks_db.append({
-                **chunk,
-                **metadata
-            })
-
         return {
             "doc_id": doc_id,
             "filename": file.filename,
@@ -128,79 +208,99 @@ async def upload_document(file: UploadFile = File(...)):
             "message": f"Document processed successfully with {len(chunks)} chunks"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/query", response_class=ORJSONResponse, responses={200: {"model": QueryResponse}})
 async def query_documents(request: QueryRequest):
     """Query the knowledge base using RAG"""
 
-    if not chunks_db:
+    if not document_store.has_chunks():
         raise HTTPException(status_code=400, detail="No documents uploaded yet")
 
     try:
+        # Embed once; near-duplicate questions are answered from the cache
+        query_embedding = await vector_store.embed_query(request.query)
+        cached = semantic_cache.lookup(query_embedding, top_k=request.top_k, tau=0.95)
+        if cached:
+            return query_result(cached['response'], cached['sources'], request.query, request.max_chars)
+
         # Retrieve relevant context
-        relevant_chunks = await vector_store.similarity_search(
-            request.query, 
+        relevant_chunks = await vector_store.similarity_search_by_vector(
+            query_embedding,
             k=request.top_k
         )
 
         if not relevant_chunks:
-            return QueryResponse(
-                response="I couldn't find relevant information in the uploaded documents.",
-                sources=[],
-                query=request.query,
-                timestamp=datetime.now().isoformat()
-            )
-
-        # Generate response using LLM
+            return query_result("I couldn't find relevant information in the uploaded documents.", [],
+                                request.query, request.max_chars)
+
+        # Generate response using LLM; a capped answer also caps generation
         response = await llm_service.generate_response(
             query=request.query,
-            context_chunks=relevant_chunks
+            context_chunks=relevant_chunks,
+            max_chars=request.max_chars
         )
 
-        # Format sources
-        sources = []
-        for chunk_text, metadata, score in relevant_chunks:
-            sources.append({
-                "source": metadata.get('source', 'Unknown'),
-                "chunk_id": metadata.get('chunk_id', 0),
-                "relevance_score": round(float(score), 3),
-                "content_preview": chunk_text[:200] + "..." if len(chunk_text) > 200 else chunk_text
-            })
+        sources = format_sources(relevant_chunks)
+        # Only full answers are cached; capped ones are trimmed from them on a hit
+        if request.max_chars is None:
+            semantic_cache.insert(query_embedding, request.top_k, response, sources)
 
-        return QueryResponse(
-            response=response,
-            sources=sources,
-            query=request.query,
-            timestamp=datetime.now().isoformat()
-        )
+        return query_result(response, sources, request.query, request.max_chars)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+
+@app.post("/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """Query the knowledge base, streaming the answer as server-sent events"""
 
+    if not document_store.has_chunks():
+        raise HTTPException(status_code=400, detail="No documents uploaded yet")
+
+    try:
+        relevant_chunks = await vector_store.similarity_search(
+            request.query,
+            k=request.top_k
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
-@app.get("/documents", response_model=List[DocumentInfo])
+    async def event_stream():
+        # Sources first, then answer tokens as the LLM produces them
+        yield f"event: sources\ndata: {orjson.dumps(format_sources(relevant_chunks)).decode()}\n\n"
+        async for token in llm_service.generate_response_stream(request.query, relevant_chunks):
+            # Newlines inside a token need their own data: lines
+            yield "".join(f"data: {line}\n" for line in token.split("\n")) + "\n"
+        yield "event: done\ndata: \n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/documents", responses={200: {"model": List[DocumentInfo]}})
 async def list_documents():
     """List all uploaded documents"""
-    return list(documents_db.values())
+    return document_store.list_documents()
 
 @app.delete("/documents/{doc_id}")
 async def delete_document(doc_id: str):
     """Delete a document and its chunks"""
 
-    if doc_id not in documents_db:
+    doc_info = document_store.get_document(doc_id)
+    if doc_info is None:
         raise HTTPException(status_code=404, detail="Document not found")
 
     try:
-        # Remove from vector store (simplified for demo)
-        # In production, implement proper vector store deletion
-
-        # Remove chunks from memory
-        global chunks_db
-        chunks_db = [chunk for chunk in chunks_db if chunk.get('doc_id') != doc_id]
-
-        # Remove document info
-        doc_info = documents_db.pop(doc_id)
+        # Remove vectors, then document info and chunks
+        await vector_store.delete_document(doc_id)
+        document_store.delete_document(doc_id)
+        semantic_cache.invalidate()
 
         # Remove file
         file_pattern = f"{doc_id}_*"
@@ -208,7 +308,7 @@ async def delete_document(doc_id: str):
             file_path.unlink()
 
         return {
-            "message": f"Document {doc_info.filename} deleted successfully",
+            "message": f"Document {doc_info['filename']} deleted successfully",
             "doc_id": doc_id
         }
 
@@ -220,11 +320,28 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "documents_count": len(documents_db),
-        "chunks_count": len(chunks_db),
+        "documents_count": document_store.count_documents(),
+        "chunks_count": document_store.count_chunks(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.head("/health")
+async def health_probe():
+    """Bodiless health check for readiness polling"""
+    return Response(status_code=200)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop + httptools from uvicorn[standard]; workers > 1 would each hold
+    # their own copy of the vector index and document state
+    workers = int(os.getenv("API_WORKERS", "1"))
+    uvicorn.run(
+        # An import string is only needed for multiple workers; otherwise pass
+        # the app so this module (and the models it loads) is not imported twice
+        "main:app" if workers > 1 else app,
+        host=os.getenv("API_HOST", "0.0.0.0"),
+        port=int(os.getenv("API_PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=workers
+    )
\ No newline at end of file
@@ -5,114 +5,283 @@ files_content = {}
 # 2. document_processor.py
 files_content['document_processor.py'] = '''import fitz  # PyMuPDF
 import docx
+import aiofiles
+import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from langchain.text_splitters import RecursiveCharacterTextSplitter
 
+# Every PyMuPDF call runs in a worker process; PyMuPDF is not thread-safe
+# and page text assembly would otherwise hold the GIL
+PROCESS_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+def _pdf_page_count(file_path: str) -> int:
+    """Number of pages in a PDF"""
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> str:
+    """Extract the text of pages [start, stop), run inside a worker process"""
+    with fitz.open(file_path) as doc:
+        return "\\n".join(doc[page_num].get_text("text") for page_num in range(start, stop)) + "\\n"
+
+
+def _overlap_length(previous: str, following: str, max_overlap: int) -> int:
+    """Length of the longest suffix of previous that starts following"""
+    for size in range(min(len(previous), len(following), max_overlap), 0, -1):
+        if previous.endswith(following[:size]):
+            return size
+    return 0
+
+
+def fast_split(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Split a short text at the latest paragraph, line or word break per window"""
+    chunks: List[str] = []
+    start, length = 0, len(text)
+
+    while start < length:
+        end = start + chunk_size
+        if end >= length:
+            chunks.append(text[start:].strip())
+            break
+
+        # Prefer breaks in the second half of the window so chunks stay full
+        cut = -1
+        for separator in ("\\n\\n", "\\n", " "):
+            cut = text.rfind(separator, start + chunk_size // 2, end)
+            if cut != -1:
+                break
+        if cut <= start:
+            cut = text.rfind(" ", start + 1, end)
+        if cut <= start:
+            cut = end
+
+        chunks.append(text[start:cut].strip())
+
+        # Step back by the overlap, aligned to the start of a word; a cut in
+        # the first half (before a long unbreakable run) moves on without it,
+        # otherwise each pass would advance by only one word
+        next_start = cut
+        if chunk_overlap and cut >= start + chunk_size // 2:
+            space = text.find(" ", cut - chunk_overlap, cut)
+            if space != -1:
+                next_start = space + 1
+        start = max(next_start, start + 1)
+
+    return [chunk for chunk in chunks if chunk]
+
+
+def merge_small(chunks: List[str], min_size: int, max_size: int, overlap: int = 0) -> List[str]:
+    """Greedily merge adjacent undersized chunks without exceeding max_size"""
+    merged: List[str] = []
+
+    for chunk in chunks:
+        if merged and (len(merged[-1]) < min_size or len(chunk) < min_size):
+            # Drop the overlap the splitter repeated at the start of this chunk
+            shared = _overlap_length(merged[-1], chunk, overlap)
+            joined = merged[-1] + chunk[shared:] if shared else merged[-1] + "\\n" + chunk
+            if len(joined) <= max_size:
+                merged[-1] = joined
+                continue
+        merged.append(chunk)
+
+    return merged
+
+
+def resplit_oversized(chunks: List[str],
+                      hard_cap: int,
+                      splitter: RecursiveCharacterTextSplitter,
+                      overlap: int = 0) -> List[str]:
+    """Re-split chunks above hard_cap, hard-slicing when no separator helps"""
+    result: List[str] = []
+    step = max(1, hard_cap - overlap)
+
+    for chunk in chunks:
+        if len(chunk) <= hard_cap:
+            result.append(chunk)
+            continue
+
+        for piece in splitter.split_text(chunk):
+            if len(piece) <= hard_cap:
+                result.append(piece)
+            else:
+                # Strict chunk size: no separator found, fall back to slicing
+                result.extend(piece[i:i + hard_cap] for i in range(0, len(piece), step))
+
+    return result
+
 class DocumentProcessor:
     """Handles document processing and text extraction for various file formats"""
-    
+
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.pdf_pages_per_task = 16
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             separators=["\\n\\n", "\\n", " ", ""]
         )
-    
+
     async def process_document(self, file_path: str) -> List[Dict[str, Any]]:
         """Process a document and return chunks with metadata"""
-        
+
         file_path = Path(file_path)
-        
+
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
-        
-        # Extract text based on file type
+
+        # Extract and split text based on file type
         if file_path.suffix.lower() == '.pdf':
-            text = await self._extract_text_from_pdf(str(file_path))
-        elif file_path.suffix.lower() == '.docx':
-            text = await self._extract_text_from_docx(str(file_path))
-        elif file_path.suffix.lower() in ['.txt', '.md']:
-            text = await self._extract_text_from_txt(str(file_path))
+            # PDF pages are streamed into the splitter without building one big string
+            chunks = await self._split_pdf(str(file_path))
         else:
-            raise ValueError(f"Unsupported file format: {file_path.suffix}")
-        
-        if not text.strip():
+            if file_path.suffix.lower() == '.docx':
+                text = await self._extract_text_from_docx(str(file_path))
+            elif file_path.suffix.lower() in ['.txt', '.md']:
+                text = await self._extract_text_from_txt(str(file_path))
+            else:
+                raise ValueError(f"Unsupported file format: {file_path.suffix}")
+
+            if not text.strip():
+                raise ValueError("No text content found in document")
+
+            # Splitting is CPU-bound, so keep it off the event loop
+            chunks = await asyncio.to_thread(self._split_text, text)
+
+        if not chunks:
             raise ValueError("No text content found in document")
-        
-        # Split text into chunks
-        chunks = self.text_splitter.split_text(text)
-        
-        # Create chunk objects with metadata
-        chunk_objects = []
-        for i, chunk in enumerate(chunks):
-            if chunk.strip():  # Only include non-empty chunks
-                chunk_objects.append({
-                    'content': chunk.strip(),
-                    'chunk_id': i,
-                    'char_count': len(chunk),
-                    'word_count': len(chunk.split()),
-                })
-        
+
+        return await asyncio.to_thread(self._build_chunks, chunks)
+
+    def _build_chunks(self, chunks: List[str]) -> List[Dict[str, Any]]:
+        """Normalize chunk sizes and attach metadata"""
+
+        # Merge fragments and re-split oversized chunks
+        chunks = merge_small(chunks,
+                             min_size=self.chunk_size // 4,
+                             max_size=self.chunk_size,
+                             overlap=self.chunk_overlap)
+        chunks = resplit_oversized(chunks,
+                                   hard_cap=int(self.chunk_size * 1.15),
+                                   splitter=self.text_splitter,
+                                   overlap=self.chunk_overlap)
+
+        # Create chunk objects with metadata, stripping each chunk only once
+        stripped = ((i, chunk.strip()) for i, chunk in enumerate(chunks))
+        chunk_objects = [
+            {
+                'content': content,
+                'chunk_id': i,
+                'char_count': len(content),
+                'word_count': len(content.split()),
+            }
+            for i, content in stripped
+            if content  # Only include non-empty chunks
+        ]
+
         return chunk_objects
-    
-    async def _extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF using PyMuPDF"""
+
+    def _split_text(self, text: str) -> List[str]:
+        """Split text, bypassing the recursive splitter for short inputs"""
+        if len(text) <= 2 * self.chunk_size:
+            return fast_split(text, self.chunk_size, self.chunk_overlap)
+        return self.text_splitter.split_text(text)
+
+    async def _split_pdf(self, file_path: str) -> List[str]:
+        """Extract text from PDF using PyMuPDF and split it into chunks"""
         try:
-            doc = fitz.open(file_path)
-            text = ""
-            
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                text += page.get_text() + "\\n"
-            
-            doc.close()
-            return text
-            
+            loop = asyncio.get_event_loop()
+            # fitz never runs on a thread, so concurrent uploads cannot share it
+            page_count = await loop.run_in_executor(PROCESS_POOL, _pdf_page_count, file_path)
+
+            step = self.pdf_pages_per_task
+            ranges = iter([(start, min(start + step, page_count)) for start in range(0, page_count, step)])
+
+            def submit(page_range: Tuple[int, int]):
+                return loop.run_in_executor(PROCESS_POOL, _extract_pdf_pages, file_path, *page_range)
+
+            # Keep a bounded number of page ranges in flight and consume them in order
+            in_flight = 2 * (os.cpu_count() or 1)
+            pending = deque(submit(page_range) for _, page_range in zip(range(in_flight), ranges))
+
+            chunks: List[str] = []
+            buffer = ""
+            while pending:
+                text = await pending.popleft()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append(submit(next_range))
+
+                finished, buffer = await asyncio.to_thread(self._feed_pdf_text, buffer, text)
+                chunks.extend(finished)
+
+            if buffer.strip():
+                chunks.extend(await asyncio.to_thread(self._split_text, buffer))
+            return chunks
+
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
-    
+
+    def _feed_pdf_text(self, buffer: str, text: str) -> Tuple[List[str], str]:
+        """Append page text to the carry-over buffer, returning finished chunks"""
+        buffer += text
+        if len(buffer) <= self.chunk_size * 4:
+            return [], buffer
+
+        pieces = self.text_splitter.split_text(buffer)
+        if not pieces:
+            return [], ""
+        # The last piece may continue on the next page, so carry it over
+        return pieces[:-1], pieces[-1] + "\\n"
+
     async def _extract_text_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\\n"
-            
-            return text
-            
+            # python-docx XML parsing is CPU-bound, so keep it off the event loop
+            return await asyncio.to_thread(self._read_docx, file_path)
+
         except Exception as e:
             raise Exception(f"Error extracting text from DOCX: {str(e)}")
-    
+
+    @staticmethod
+    def _read_docx(file_path: str) -> str:
+        """Collect paragraph and table text, joined once"""
+        doc = docx.Document(file_path)
+        parts = [paragraph.text for paragraph in doc.paragraphs]
+
+        # Extract text from tables, one line per row
+        for table in doc.tables:
+            for row in table.rows:
+                parts.append(" ".join(cell.text for cell in row.cells))
+
+        return "\\n".join(parts)
+
     async def _extract_text_from_txt(self, file_path: str) -> str:
         """Extract text from TXT/MD file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-                
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
+                return await file.read()
+
         except Exception as e:
             raise Exception(f"Error extracting text from TXT: {str(e)}")
-    
+
     def get_document_stats(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Get statistics about processed document"""
         if not chunks:
             return {}
-        
-        total_chars = sum(chunk['char_count'] for chunk in chunks)
-        total_words = sum(chunk['word_count'] for chunk in chunks)
-        
+
+        # Single pass over the chunks for both totals
+        total_chars = total_words = 0
+        for chunk in chunks:
+            total_chars += chunk['char_count']
+            total_words += chunk['word_count']
+
         return {
             'total_chunks': len(chunks),
             'total_characters': total_chars,
@@ -122,198 +291,1204 @@ class DocumentProcessor:
         }'''
 
 # 3. vector_store.py
-files_content['vector_store.py'] = '''import numpy as np
+files_content['vector_store.py'] = '''import os
+import numpy as np
 import faiss
 import pickle
+import json
+import base64
+import hashlib
 from pathlib import Path
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, Callable, Awaitable, Set
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import torch
 from sentence_transformers import SentenceTransformer
+from embedding_cache import EmbeddingCache
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _fingerprint(text: str) -> int:
+    """64-bit content hash used to detect duplicate chunks"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class MicroBatcher:
+    """Coalesce concurrent requests that arrive within a short window into one call"""
+
+    def __init__(self,
+                 process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_batch_size: int = 32,
+                 max_wait: float = 0.005):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only holds weak references to tasks, so running batches
+        # are kept here until they finish
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result from the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+class OnnxEncoder:
+    """Sentence embedding encoder running an exported model on ONNX Runtime"""
+
+    def __init__(self, model_dir: str, max_length: int = 256):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        # Prefer the dynamically quantized INT8 export when present
+        model_file = model_dir / "model.int8.onnx"
+        if not model_file.exists():
+            model_file = model_dir / "model.onnx"
+
+        available = ort.get_available_providers()
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+
+        self.session = ort.InferenceSession(str(model_file), providers=providers)
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.max_length = max_length
+
+    def encode(self,
+               texts: List[str],
+               batch_size: int = 32,
+               convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False,
+               show_progress_bar: bool = False) -> np.ndarray:
+        """Mean-pooled embeddings, matching SentenceTransformer.encode"""
+        # Batch texts of similar length so each pads to little more than itself
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        sorted_texts = [texts[i] for i in order]
+
+        batches = []
+        for start in range(0, len(sorted_texts), batch_size):
+            tokens = self.tokenizer(sorted_texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors="np")
+            feed = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+            if "token_type_ids" in self.input_names and "token_type_ids" not in feed:
+                feed["token_type_ids"] = np.zeros_like(feed["input_ids"])
+
+            hidden = self.session.run(None, feed)[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32, copy=False))
+
+        if not batches:
+            return np.empty((0, self.session.get_outputs()[0].shape[-1]), dtype=np.float32)
+        # Undo the length sort so rows match the input order
+        return np.vstack(batches)[np.argsort(order)]
+
 class VectorStore:
     """Vector database for storing and searching document embeddings"""
-    
+
     def __init__(self, 
                  model_name: str = "all-MiniLM-L6-v2",
                  index_path: str = "vector_index.faiss",
-                 metadata_path: str = "vector_metadata.pkl"):
-        
+                 metadata_path: str = "vector_metadata.jsonl",
+                 index_type: str = "hnsw",
+                 wal_path: Optional[str] = None,
+                 onnx_model_path: Optional[str] = None,
+                 embedding_cache_path: Optional[str] = None,
+                 use_gpu: bool = True):
+
         self.model_name = model_name
         self.index_path = index_path
+        # Snapshots are JSON lines; a legacy .pkl path is migrated on load
+        if Path(metadata_path).suffix == '.pkl':
+            metadata_path = str(Path(metadata_path).with_suffix('.jsonl'))
         self.metadata_path = metadata_path
+        # Append-only log of rows added since the last full snapshot
+        self.wal_path = wal_path or str(Path(metadata_path).with_suffix('.wal.jsonl'))
+        self.vectors_path = str(Path(index_path).with_suffix('.vectors.npy'))
+        for path in (index_path, metadata_path):
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._dirty_since_save = 0
+        self.index_type = index_type
         self.dimension = 384  # all-MiniLM-L6-v2 embedding dimension
-        
-        # Initialize sentence transformer
-        logger.info(f"Loading embedding model: {model_name}")
-        self.encoder = SentenceTransformer(model_name)
-        
-        # Initialize FAISS index
-        self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
-        
-        # Store metadata for each vector
+
+        # HNSW settings: graph quality at build time, breadth at query time
+        self.hnsw_ef_construction = 200
+        self.hnsw_ef_search = 64
+
+        # IVF-PQ settings: train once this many vectors are available
+        self.ivf_train_size = 10000
+        self.ivf_nlist = 100  # ~sqrt(N) lists for the initial training set
+        self.ivf_nprobe = 10
+        self.pq_m = 48
+        self.pq_nbits = 8
+
+        # Below this many vectors a NumPy matmul beats FAISS call overhead
+        self.numpy_search_threshold = 1000
+
+        # Initialize the encoder: an ONNX export when configured, otherwise
+        # the sentence transformer (FP16 on GPU halves memory bandwidth)
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.encoder = None
+        if onnx_model_path:
+            try:
+                logger.info(f"Loading ONNX embedding model from {onnx_model_path}")
+                self.encoder = OnnxEncoder(onnx_model_path)
+            except Exception as e:
+                logger.warning(f"ONNX encoder unavailable ({str(e)}), using sentence-transformers")
+
+        if self.encoder is None:
+            logger.info(f"Loading embedding model: {model_name} on {self.device}")
+            self.encoder = SentenceTransformer(model_name, device=self.device)
+            if self.device == 'cuda':
+                self.encoder = self.encoder.half()
+        # Texts per encoder call; sub-batches of a large request run concurrently
+        self.encode_batch_size = 32
+        self._encode_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+        # Texts per encode/index pipeline stage in add_documents
+        self.pipeline_batch_size = 256
+
+        # Initialize FAISS index (inner product for cosine similarity)
+        faiss.omp_set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+        self.index = self._create_index()
+
+        # Searches run on a GPU copy of the index when faiss-gpu and a device
+        # are available; self.index stays on the CPU for adds and saving
+        self._gpu_resources = self._init_gpu() if use_gpu else None
+        self._gpu_index = None
+        self._gpu_source = None
+
+        # Chunk embeddings by content hash, kept across deletes and clears
+        self.embedding_cache = EmbeddingCache(
+            embedding_cache_path or str(Path(metadata_path).with_suffix('.embeddings.db')),
+            model_name,
+            self.dimension
+        )
+
+        # Concurrent queries share one encoder forward pass and one index.search call
+        self._encode_batcher = MicroBatcher(self._encode_batch, max_batch_size=32, max_wait=0.005)
+        self._search_batcher = MicroBatcher(self._search_batch, max_batch_size=32, max_wait=0.005)
+
+        # Store metadata for each vector, plus the raw embeddings as one
+        # contiguous (N, dimension) float32 matrix grown by doubling; quantized
+        # indexes only keep it while small enough for NumPy search
         self.metadata = []
         self.texts = []
-        
+        self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+
+        # Duplicate chunks reuse an existing row: content hash -> row, and
+        # row -> extra metadata entries that share that row's vector
+        self._text_hashes: Dict[int, int] = {}
+        self._aliases: Dict[int, List[Dict[str, Any]]] = {}
+        self._alias_seq = 0
+
+        # Serializes adds and deletes; created on first use so it binds to
+        # the server's event loop rather than the one current at import
+        self._write_lock: Optional[asyncio.Lock] = None
+
         # Load existing index if available
         self._load_index()
-    
+
     async def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]]):
         """Add documents to the vector store"""
-        
+
         if len(texts) != len(metadatas):
             raise ValueError("Number of texts and metadatas must match")
-        
+
         if not texts:
             return
-        
+
         logger.info(f"Adding {len(texts)} documents to vector store")
-        
-        # Generate embeddings
-        embeddings = await self._generate_embeddings(texts)
-        
-        # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(embeddings)
-        
-        # Add to FAISS index
-        self.index.add(embeddings)
-        
-        # Store texts and metadata
-        self.texts.extend(texts)
-        self.metadata.extend(metadatas)
-        
-        # Save updated index
-        self._save_index()
-        
-        logger.info(f"Successfully added {len(texts)} documents. Total vectors: {self.index.ntotal}")
-    
+
+        async with self._writer():
+            duplicates = await self._add_documents(texts, metadatas)
+
+        logger.info(f"Successfully added {len(texts)} documents "
+                    f"({duplicates} duplicates reused). Total vectors: {self.index.ntotal}")
+
+    def _writer(self) -> asyncio.Lock:
+        """Lock held while the stored rows are being changed"""
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    async def _add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> int:
+        """Embed and index new chunks, returning how many duplicated a stored row"""
+        # Only embed chunks whose content is not already stored
+        first_row = len(self.texts)
+        new_items: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        dup_refs: List[Tuple[int, Dict[str, Any]]] = []
+        for text, metadata in zip(texts, metadatas):
+            key = _fingerprint(text)
+            if key in self._text_hashes or key in new_items:
+                dup_refs.append((key, metadata))
+            else:
+                new_items[key] = (text, metadata)
+
+        if new_items:
+            # Longest first, so each encoder batch pads to similar lengths
+            ordered = sorted(new_items.items(), key=lambda item: len(item[1][0]), reverse=True)
+            await self._embed_and_index([text for _, (text, _) in ordered],
+                                        [metadata for _, (_, metadata) in ordered],
+                                        [key for key, _ in ordered])
+
+        if dup_refs:
+            self._add_aliases([(self._text_hashes[key], metadata) for key, metadata in dup_refs])
+
+        # Rewrite the full snapshot when the index size crosses a power of
+        # two so total save cost stays linear
+        if first_row.bit_length() != len(self.texts).bit_length():
+            self._save_index()
+
+        return len(dup_refs)
+
+    async def _embed_and_index(self,
+                               texts: List[str],
+                               metadatas: List[Dict[str, Any]],
+                               keys: List[int]):
+        """Encode the next sub-batch while the current one is added to the index"""
+        size = self.pipeline_batch_size
+        starts = range(0, len(texts), size)
+
+        # At most two sub-batches of embeddings are alive: one encoding, one indexing
+        pending = asyncio.ensure_future(self._embed_documents(texts[:size]))
+        for start in starts:
+            embeddings = await pending
+            if start + size < len(texts):
+                pending = asyncio.ensure_future(
+                    self._embed_documents(texts[start + size:start + 2 * size]))
+
+            # Add to FAISS index (embeddings are already L2-normalized)
+            self.index = self._prepare_index(self.index, embeddings)
+            self.index.add(embeddings)
+            # Extend the GPU replica in place instead of re-copying the whole
+            # index on the next search; it is only re-cloned when replaced
+            if self._gpu_index is not None and self._gpu_source is self.index:
+                self._gpu_index.add(embeddings)
+            self._append_vectors(embeddings)
+
+            # Store texts and metadata for this sub-batch, then log the new rows
+            first_row = len(self.texts)
+            batch_texts = texts[start:start + size]
+            batch_metadatas = metadatas[start:start + size]
+            self.texts.extend(batch_texts)
+            self.metadata.extend(batch_metadatas)
+            for offset, key in enumerate(keys[start:start + size]):
+                self._text_hashes[key] = first_row + offset
+            self._append_wal(first_row, batch_texts, batch_metadatas, embeddings)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Stored embeddings, one row per text"""
+        return self._vector_buffer[:self._vector_count]
+
+    @vectors.setter
+    def vectors(self, vectors: np.ndarray):
+        self._vector_buffer = np.ascontiguousarray(vectors, dtype=np.float32)
+        self._vector_count = len(vectors)
+
+    def _stores_vectors(self, rows: int) -> bool:
+        """Whether the float32 matrix is kept for a store of this many rows"""
+        # sq8 and ivfpq exist to cut memory per vector, so past the NumPy
+        # search threshold they rely on the index alone
+        return self.index_type in ("flat", "hnsw") or rows < self.numpy_search_threshold
+
+    def _append_vectors(self, embeddings: np.ndarray):
+        """Copy embeddings into the buffer, doubling its capacity when full"""
+        # Called before self.texts is extended with the new rows
+        if self._vector_count != len(self.texts) or not self._stores_vectors(len(self.texts) + len(embeddings)):
+            if len(self._vector_buffer):
+                self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+            return
+
+        needed = self._vector_count + len(embeddings)
+        if needed > len(self._vector_buffer):
+            capacity = max(needed, 2 * len(self._vector_buffer), 1024)
+            buffer = np.empty((capacity, self.dimension), dtype=np.float32)
+            buffer[:self._vector_count] = self.vectors
+            self._vector_buffer = buffer
+
+        self._vector_buffer[self._vector_count:needed] = embeddings
+        self._vector_count = needed
+
+    async def delete_document(self, doc_id: str) -> int:
+        """Remove every chunk of a document and rebuild the index, returning the count"""
+        async with self._writer():
+            # Rebuilding can take seconds, so it runs on a thread against the
+            # current rows while searches keep reading them
+            compacted = await asyncio.to_thread(self._compact_without, doc_id)
+            if compacted is None:
+                return 0
+
+            # Swap in the new state in one step on the event loop
+            removed, index, vectors, texts, metadata, aliases, text_hashes = compacted
+            self.index = index
+            self.vectors = vectors
+            self.texts = texts
+            self.metadata = metadata
+            self._aliases = aliases
+            self._text_hashes = text_hashes
+
+            # Logged rows refer to old positions, so replace them with a snapshot
+            await asyncio.to_thread(self._save_index)
+
+        logger.info(f"Deleted {removed} chunks of document {doc_id}. Total vectors: {self.index.ntotal}")
+        return removed
+
+    def _compact_without(self, doc_id: str) -> Optional[Tuple[int, faiss.Index, np.ndarray, List[str],
+                                                              List[Dict[str, Any]], Dict[int, List[Dict[str, Any]]],
+                                                              Dict[int, int]]]:
+        """Stored rows with a document removed and a rebuilt index, or None if it has no chunks"""
+        # Drop the document's aliases; a row whose own metadata belongs to
+        # the document survives if another document still shares it
+        removed = 0
+        aliases: Dict[int, List[Dict[str, Any]]] = {}
+        for row, entries in self._aliases.items():
+            kept = [entry for entry in entries if entry.get('doc_id') != doc_id]
+            removed += len(entries) - len(kept)
+            if kept:
+                aliases[row] = kept
+
+        metadata = list(self.metadata)
+        keep = np.ones(len(metadata), dtype=bool)
+        for row, entry in enumerate(metadata):
+            if entry.get('doc_id') != doc_id:
+                continue
+            removed += 1
+            if aliases.get(row):
+                metadata[row] = aliases[row].pop(0)
+                if not aliases[row]:
+                    del aliases[row]
+            else:
+                keep[row] = False
+
+        if not removed:
+            return None
+
+        # Compact rows with one mask and remap alias rows to their new positions
+        new_rows = np.cumsum(keep) - 1
+        kept_rows = np.flatnonzero(keep)
+        vectors = self._all_vectors()[keep]
+        texts = [self.texts[row] for row in kept_rows]
+        metadata = [metadata[row] for row in kept_rows]
+        aliases = {int(new_rows[row]): entries for row, entries in aliases.items()}
+
+        # Rebuild the index from the compacted matrix
+        index = self._create_index()
+        if len(vectors):
+            index = self._prepare_index(index, vectors)
+            index.add(vectors)
+        if not self._stores_vectors(len(texts)):
+            vectors = np.empty((0, self.dimension), dtype=np.float32)
+
+        return removed, index, vectors, texts, metadata, aliases, self._hash_rows(texts)
+
+    def _all_vectors(self) -> np.ndarray:
+        """Embeddings of every stored row, decoded from the index when the matrix is not kept"""
+        if len(self.vectors) == len(self.texts):
+            return self.vectors
+        try:
+            # Quantized codes decode to approximate vectors, which is what
+            # the rebuilt index would store anyway
+            return self.index.reconstruct_n(0, self.index.ntotal)
+        except Exception as e:
+            raise RuntimeError(f"Embedding matrix unavailable, cannot rebuild index: {str(e)}")
+
     async def similarity_search(self, 
                               query: str, 
                               k: int = 5) -> List[Tuple[str, Dict[str, Any], float]]:
         """Search for similar documents"""
-        
+
         if self.index.ntotal == 0:
             return []
-        
-        # Generate query embedding
-        query_embeddings = await self._generate_embeddings([query])
-        query_embedding = query_embeddings[0:1]  # Keep as 2D array
-        
-        # Normalize query embedding
-        faiss.normalize_L2(query_embedding)
-        
-        # Search
+
+        query_embedding = await self.embed_query(query)
+        return await self.similarity_search_by_vector(query_embedding, k)
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query as a (1, dimension) L2-normalized array"""
+        # Batched with other in-flight queries
+        return await self._encode_batcher.submit(query)
+
+    async def _encode_batch(self, queries: List[str]) -> List[np.ndarray]:
+        """Run one encoder pass for a batch of queries"""
+        embeddings = await self._generate_embeddings(queries)
+        return [embeddings[i:i + 1] for i in range(len(queries))]  # Keep as 2D arrays
+
+    async def similarity_search_by_vector(self,
+                                          query_embedding: np.ndarray,
+                                          k: int = 5) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Search for documents similar to an already embedded query"""
+
+        if self.index.ntotal == 0:
+            return []
+
+        # Search (batched with other in-flight queries)
         k = min(k, self.index.ntotal)  # Don't search for more than available
-        scores, indices = self.index.search(query_embedding, k)
-        
-        # Format results
+        scores, indices = await self._search_batcher.submit((query_embedding, k))
+
+        # Drop invalid rows with one mask and convert to Python types in bulk
+        rows, row_scores = indices[0], scores[0]
+        valid = (rows >= 0) & (rows < len(self.texts))
+        rows, row_scores = rows[valid].tolist(), row_scores[valid].tolist()
+
+        if not self._aliases:
+            return [(self.texts[row], self.metadata[row], score) for row, score in zip(rows, row_scores)]
+
+        # Include duplicate chunks that share a row
         results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.texts) and idx != -1:  # Valid index
-                results.append((
-                    self.texts[idx],
-                    self.metadata[idx],
-                    float(score)
-                ))
-        
-        return results
-    
+        for row, score in zip(rows, row_scores):
+            text = self.texts[row]
+            results.append((text, self.metadata[row], score))
+            for alias in self._aliases.get(row, ()):
+                results.append((text, alias, score))
+
+        return results[:k]
+
+    async def _search_batch(self,
+                            requests: List[Tuple[np.ndarray, int]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Run one FAISS search for a batch of (query_embedding, k) requests"""
+        queries = np.vstack([query for query, _ in requests])
+        max_k = min(max(k for _, k in requests), self.index.ntotal)
+
+        # Loaded indexes keep the efSearch they were saved with, so apply ours
+        if isinstance(self.index, faiss.IndexHNSW):
+            self.index.hnsw.efSearch = max(self.hnsw_ef_search, max_k)
+        elif isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = self.ivf_nprobe
+
+        if self.index.ntotal < self.numpy_search_threshold and len(self.vectors) == self.index.ntotal:
+            scores, indices = self.similarity_search_numpy(queries, max_k)
+        else:
+            # FAISS amortizes the scan over all queries in the batch
+            scores, indices = self._search_index().search(queries, max_k)
+
+        return [(scores[i:i + 1, :k], indices[i:i + 1, :k]) for i, (_, k) in enumerate(requests)]
+
+    def _init_gpu(self) -> Optional[Any]:
+        """GPU resources for FAISS, or None when running on CPU only"""
+        if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            return None
+        try:
+            resources = faiss.StandardGpuResources()
+            logger.info("FAISS searches will run on GPU")
+            return resources
+        except Exception as e:
+            logger.warning(f"FAISS GPU unavailable ({str(e)}), searching on CPU")
+            return None
+
+    def _search_index(self) -> faiss.Index:
+        """Index to search: a GPU copy of self.index when possible"""
+        # HNSW has no GPU implementation
+        if self._gpu_resources is None or isinstance(self.index, faiss.IndexHNSW):
+            return self.index
+
+        # Re-copy after the CPU index was replaced (IVF-PQ training, deletes);
+        # adds keep the copy in sync, so a size mismatch only guards against drift
+        if self._gpu_source is not self.index or self._gpu_index.ntotal != self.index.ntotal:
+            try:
+                options = faiss.GpuClonerOptions()
+                # Needed for IVF-PQ with many sub-quantizers
+                options.useFloat16 = isinstance(self.index, faiss.IndexIVFPQ)
+                self._gpu_index = faiss.index_cpu_to_gpu(self._gpu_resources, 0, self.index, options)
+                self._gpu_source = self.index
+            except Exception as e:
+                logger.warning(f"Cannot move {self.index_type} index to GPU ({str(e)}), searching on CPU")
+                self._gpu_resources = None
+                self._gpu_index = self._gpu_source = None
+                return self.index
+
+        return self._gpu_index
+
+    def similarity_search_numpy(self,
+                                queries: np.ndarray,
+                                k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact inner-product search over the stored matrix, shaped like faiss search output"""
+        # One BLAS matmul for all queries, then an O(N) top-k selection per row
+        scores = queries @ self.vectors.T
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+
+        # Only the k selected entries are sorted
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def _create_index(self) -> faiss.Index:
+        """Create an empty FAISS index of the configured type"""
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(self.dimension)
+
+        if self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self.dimension, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.hnsw_ef_construction
+            index.hnsw.efSearch = self.hnsw_ef_search
+            return index
+
+        if self.index_type == "sq8":
+            # int8 codes: 384 bytes per vector instead of 1536
+            index = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit,
+                                               faiss.METRIC_INNER_PRODUCT)
+            # Widen the trained value range so later vectors are rarely clipped
+            index.sq.rangestat = faiss.ScalarQuantizer.RS_minmax
+            index.sq.rangestat_arg = 0.1
+            return index
+
+        if self.index_type == "ivfpq":
+            # IVF-PQ needs training data, so start exact until enough vectors arrive
+            return faiss.IndexFlatIP(self.dimension)
+
+        raise ValueError(f"Unsupported index type: {self.index_type}")
+
+    def _prepare_index(self, index: faiss.Index, embeddings: np.ndarray) -> faiss.Index:
+        """Train quantized indexes before vectors are added, returning the index to add to"""
+        if not index.is_trained:
+            # Scalar quantizer ranges are learned from the first batch
+            index.train(embeddings)
+            return index
+
+        if self.index_type != "ivfpq" or isinstance(index, faiss.IndexIVFPQ):
+            return index
+
+        if index.ntotal + len(embeddings) < self.ivf_train_size:
+            return index
+
+        # Move already indexed vectors into the trained quantized index
+        existing = index.reconstruct_n(0, index.ntotal)
+        training = np.vstack([existing, embeddings])
+
+        logger.info(f"Training IVF-PQ index on {len(training)} vectors")
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        trained = faiss.IndexIVFPQ(quantizer, self.dimension, self.ivf_nlist,
+                                   self.pq_m, self.pq_nbits, faiss.METRIC_INNER_PRODUCT)
+        trained.train(training)
+        trained.nprobe = self.ivf_nprobe
+        # Row lookups let deletes decode the stored vectors
+        trained.make_direct_map()
+        if len(existing):
+            trained.add(existing)
+        return trained
+
+    async def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Embed chunk texts, encoding only those missing from the embedding cache"""
+        keys = [EmbeddingCache.key(text) for text in texts]
+        cached = self.embedding_cache.get_many(keys)
+
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        misses = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                embeddings[i] = cached[key]
+            else:
+                misses.append(i)
+
+        if misses:
+            encoded = await self._generate_embeddings([texts[i] for i in misses])
+            embeddings[misses] = encoded
+            self.embedding_cache.put_many([(keys[i], encoded[j]) for j, i in enumerate(misses)])
+
+        if cached:
+            logger.info(f"Embedding cache hits: {len(texts) - len(misses)}/{len(texts)}")
+        return embeddings
+
     async def _generate_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Generate embeddings for texts"""
-        
+        """Generate L2-normalized embeddings for texts"""
+
         # Run in thread pool to avoid blocking
         loop = asyncio.get_event_loop()
-        
-        def encode_texts():
+
+        def encode_texts(batch: List[str]) -> np.ndarray:
             return self.encoder.encode(
-                texts, 
+                batch,
+                batch_size=self.encode_batch_size,
                 convert_to_numpy=True,
+                normalize_embeddings=True,
                 show_progress_bar=False
             )
-        
-        embeddings = await loop.run_in_executor(None, encode_texts)
-        return embeddings.astype('float32')
-    
+
+        # Encode fixed-size sub-batches concurrently, preserving input order
+        size = self.encode_batch_size
+        batches = await asyncio.gather(*[
+            loop.run_in_executor(self._encode_pool, encode_texts, texts[start:start + size])
+            for start in range(0, len(texts), size)
+        ])
+        if not batches:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if len(batches) == 1:
+            # No copy when the encoder already produced float32
+            return np.asarray(batches[0], dtype=np.float32)
+        # Joining and casting FP16 output to float32 for FAISS happen in one pass
+        return np.concatenate(batches, dtype=np.float32)
+
+    def _append_wal(self,
+                    first_row: int,
+                    texts: List[str],
+                    metadatas: List[Dict[str, Any]],
+                    embeddings: np.ndarray):
+        """Append newly added rows to the write-ahead log"""
+        try:
+            with open(self.wal_path, 'a', encoding='utf-8') as f:
+                for offset, (text, metadata, embedding) in enumerate(zip(texts, metadatas, embeddings)):
+                    f.write(json.dumps({
+                        'row': first_row + offset,
+                        'text': text,
+                        'metadata': metadata,
+                        'vector': base64.b64encode(embedding.tobytes()).decode('ascii')
+                    }) + "\\n")
+
+            self._dirty_since_save += len(texts)
+
+        except Exception as e:
+            logger.error(f"Error writing WAL: {str(e)}")
+
+    def _add_aliases(self, dup_refs: List[Tuple[int, Dict[str, Any]]]):
+        """Attach metadata of duplicate chunks to existing rows and log it"""
+        try:
+            with open(self.wal_path, 'a', encoding='utf-8') as f:
+                for row, metadata in dup_refs:
+                    self._aliases.setdefault(row, []).append(metadata)
+                    f.write(json.dumps({
+                        'alias_of': row,
+                        'alias_seq': self._alias_seq,
+                        'metadata': metadata
+                    }) + "\\n")
+                    self._alias_seq += 1
+
+            self._dirty_since_save += len(dup_refs)
+
+        except Exception as e:
+            logger.error(f"Error writing WAL: {str(e)}")
+
+    @staticmethod
+    def _hash_rows(texts: List[str]) -> Dict[int, int]:
+        """Content hashes of stored rows, keeping the first occurrence"""
+        text_hashes: Dict[int, int] = {}
+        for row, text in enumerate(texts):
+            text_hashes.setdefault(_fingerprint(text), row)
+        return text_hashes
+
+    def _replay_wal(self):
+        """Re-apply rows logged after the last snapshot"""
+        wal_path = Path(self.wal_path)
+        if not wal_path.exists():
+            return
+
+        texts, metadatas, vectors = [], [], []
+        with open(wal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write
+                    logger.warning("Ignoring incomplete WAL record")
+                    break
+
+                if 'alias_of' in record:
+                    # Aliases already covered by the snapshot are skipped
+                    if record['alias_seq'] >= self._alias_seq:
+                        self._aliases.setdefault(record['alias_of'], []).append(record['metadata'])
+                        self._alias_seq = record['alias_seq'] + 1
+                        self._dirty_since_save += 1
+                    continue
+
+                # Rows already covered by the snapshot are skipped
+                if record['row'] < len(self.texts) + len(texts):
+                    continue
+
+                texts.append(record['text'])
+                metadatas.append(record['metadata'])
+                vectors.append(np.frombuffer(base64.b64decode(record['vector']), dtype=np.float32))
+
+        if texts:
+            embeddings = np.vstack(vectors)
+            self.index = self._prepare_index(self.index, embeddings)
+            self.index.add(embeddings)
+            self._append_vectors(embeddings)
+            self.texts.extend(texts)
+            self.metadata.extend(metadatas)
+            self._dirty_since_save += len(texts)
+            logger.info(f"Replayed {len(texts)} vectors from WAL")
+
     def _save_index(self):
         """Save FAISS index and metadata to disk"""
         try:
-            # Save FAISS index
-            faiss.write_index(self.index, self.index_path)
-            
-            # Save metadata and texts
-            with open(self.metadata_path, 'wb') as f:
-                pickle.dump({
-                    'metadata': self.metadata,
-                    'texts': self.texts,
-                    'model_name': self.model_name
-                }, f)
-            
+            # Save FAISS index and the raw embedding matrix, each replaced
+            # atomically so a crash never leaves a truncated file behind
+            index_tmp = self.index_path + ".tmp"
+            faiss.write_index(self.index, index_tmp)
+            os.replace(index_tmp, self.index_path)
+            if len(self.vectors) == len(self.texts) and self._stores_vectors(len(self.texts)):
+                vectors_tmp = self.vectors_path + ".tmp"
+                with open(vectors_tmp, 'wb') as f:
+                    np.save(f, self.vectors)
+                os.replace(vectors_tmp, self.vectors_path)
+            elif Path(self.vectors_path).exists():
+                Path(self.vectors_path).unlink()
+
+            # Save texts and metadata as JSON lines: a header, then one line per row
+            metadata_tmp = self.metadata_path + ".tmp"
+            with open(metadata_tmp, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'model_name': self.model_name,
+                    'alias_seq': self._alias_seq,
+                    'rows': len(self.texts)
+                }) + "\\n")
+                for row, (text, metadata) in enumerate(zip(self.texts, self.metadata)):
+                    record = {'text': text, 'metadata': metadata}
+                    if row in self._aliases:
+                        record['aliases'] = self._aliases[row]
+                    f.write(json.dumps(record) + "\\n")
+            os.replace(metadata_tmp, self.metadata_path)
+
+            legacy_path = Path(self.metadata_path).with_suffix('.pkl')
+            if legacy_path.exists():
+                legacy_path.unlink()
+
+            # Snapshot now covers every logged row
+            if Path(self.wal_path).exists():
+                Path(self.wal_path).unlink()
+            self._dirty_since_save = 0
+
             logger.info(f"Saved vector index with {self.index.ntotal} vectors")
-            
+
         except Exception as e:
             logger.error(f"Error saving index: {str(e)}")
-    
+
     def _load_index(self):
         """Load FAISS index and metadata from disk"""
         try:
             index_path = Path(self.index_path)
             metadata_path = Path(self.metadata_path)
-            
-            if index_path.exists() and metadata_path.exists():
+            legacy_path = metadata_path.with_suffix('.pkl')
+
+            if index_path.exists() and (metadata_path.exists() or legacy_path.exists()):
                 # Load FAISS index
                 self.index = faiss.read_index(self.index_path)
-                
+                if isinstance(self.index, faiss.IndexIVF):
+                    self.index.make_direct_map()
+                self.vectors = self._load_vectors()
+
                 # Load metadata and texts
-                with open(self.metadata_path, 'rb') as f:
-                    data = pickle.load(f)
-                    self.metadata = data.get('metadata', [])
-                    self.texts = data.get('texts', [])
-                    saved_model = data.get('model_name', self.model_name)
-                
+                if metadata_path.exists():
+                    saved_model = self._read_metadata()
+                else:
+                    saved_model = self._read_legacy_metadata(legacy_path)
+
                 if saved_model != self.model_name:
                     logger.warning(f"Model mismatch: saved={saved_model}, current={self.model_name}")
-                
+
                 logger.info(f"Loaded vector index with {self.index.ntotal} vectors")
             else:
                 logger.info("No existing index found, starting fresh")
-                
+
+            self._replay_wal()
+            self._text_hashes = self._hash_rows(self.texts)
+
         except Exception as e:
             logger.error(f"Error loading index: {str(e)}")
             logger.info("Starting with fresh index")
-            self.index = faiss.IndexFlatIP(self.dimension)
+            self.index = self._create_index()
             self.metadata = []
             self.texts = []
-    
+            self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+            self._text_hashes = {}
+            self._aliases = {}
+            self._alias_seq = 0
+            self._dirty_since_save = 0
+
+    def _read_metadata(self) -> str:
+        """Read the JSON lines snapshot, returning the model it was built with"""
+        with open(self.metadata_path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            self.texts, self.metadata, self._aliases = [], [], {}
+            for row, line in enumerate(f):
+                record = json.loads(line)
+                self.texts.append(record['text'])
+                self.metadata.append(record['metadata'])
+                if 'aliases' in record:
+                    self._aliases[row] = record['aliases']
+
+        self._alias_seq = header.get('alias_seq', 0)
+        return header.get('model_name', self.model_name)
+
+    def _read_legacy_metadata(self, legacy_path: Path) -> str:
+        """Read a snapshot saved by older versions as a pickle"""
+        logger.info(f"Migrating pickled metadata from {legacy_path}")
+        with open(legacy_path, 'rb') as f:
+            data = pickle.load(f)
+            self.metadata = data.get('metadata', [])
+            self.texts = data.get('texts', [])
+            self._aliases = data.get('aliases', {})
+            self._alias_seq = data.get('alias_seq', 0)
+
+        # Rewritten in the JSON format on the next save
+        self._dirty_since_save += 1
+        return data.get('model_name', self.model_name)
+
+    def _load_vectors(self) -> np.ndarray:
+        """Load the saved embedding matrix, rebuilding it from the index for older snapshots"""
+        if not self._stores_vectors(self.index.ntotal):
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        if Path(self.vectors_path).exists():
+            # Memory-mapped; pages are read as searches touch them and the
+            # matrix is copied into RAM once new vectors are appended
+            return np.load(self.vectors_path, mmap_mode='r')
+
+        try:
+            return self.index.reconstruct_n(0, self.index.ntotal)
+        except Exception:
+            # Some index types cannot reconstruct; searches then stay on FAISS
+            logger.warning("Embedding matrix unavailable, NumPy search disabled")
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+    def close(self):
+        """Write a full snapshot if rows were added since the last one"""
+        if self._dirty_since_save:
+            self._save_index()
+        self._encode_pool.shutdown(wait=False)
+        self.embedding_cache.close()
+
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
         return {
             'total_vectors': int(self.index.ntotal),
             'dimension': self.dimension,
+            'index_type': self.index_type,
             'model_name': self.model_name,
             'total_texts': len(self.texts),
-            'total_metadata': len(self.metadata)
+            'total_metadata': len(self.metadata),
+            'duplicate_chunks': sum(len(aliases) for aliases in self._aliases.values())
         }
-    
+
     def clear(self):
         """Clear all vectors and metadata"""
-        self.index = faiss.IndexFlatIP(self.dimension)
+        self.index = self._create_index()
         self.metadata = []
         self.texts = []
-        
+        self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+        self._text_hashes = {}
+        self._aliases = {}
+        self._alias_seq = 0
+        self._dirty_since_save = 0
+
         # Remove saved files
-        for path in [self.index_path, self.metadata_path]:
+        legacy_path = str(Path(self.metadata_path).with_suffix('.pkl'))
+        for path in [self.index_path, self.metadata_path, legacy_path, self.vectors_path, self.wal_path]:
             if Path(path).exists():
                 Path(path).unlink()
-        
+
         logger.info("Cleared vector store")'''
 
+# semantic_cache.py
+files_content['semantic_cache.py'] = '''import time
+from collections import OrderedDict
+from threading import RLock
+from typing import List, Dict, Any, Optional
+import numpy as np
+import faiss
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """LRU cache of query responses, matched by query embedding similarity"""
+
+    def __init__(self,
+                 dimension: int = 384,
+                 max_entries: int = 1024,
+                 ttl_seconds: float = 600,
+                 candidates: int = 4):
+
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.candidates = candidates  # Nearest cached queries checked per lookup
+
+        # Query embeddings keyed by entry id, so evicted entries can be removed
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+
+        # entry id -> (top_k, response, sources, timestamp), oldest first
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._lock = RLock()
+
+    def lookup(self,
+               embedding: np.ndarray,
+               top_k: int,
+               tau: float = 0.95) -> Optional[Dict[str, Any]]:
+        """Return a cached response for a query within cosine tau, if any"""
+        with self._lock:
+            if self.index.ntotal == 0:
+                return None
+
+            k = min(self.candidates, self.index.ntotal)
+            scores, ids = self.index.search(embedding.reshape(1, -1), k)
+
+            now = time.monotonic()
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or score < tau:
+                    break
+
+                entry_top_k, response, sources, timestamp = self.entries[int(entry_id)]
+                if now - timestamp > self.ttl_seconds:
+                    self._evict(int(entry_id))
+                    continue
+                if entry_top_k != top_k:
+                    continue
+
+                self.entries.move_to_end(int(entry_id))
+                return {'response': response, 'sources': sources}
+
+            return None
+
+    def insert(self,
+               embedding: np.ndarray,
+               top_k: int,
+               response: str,
+               sources: List[dict]):
+        """Cache the response for a query embedding"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+
+            self.index.add_with_ids(embedding.reshape(1, -1), np.array([entry_id], dtype=np.int64))
+            self.entries[entry_id] = (top_k, response, sources, time.monotonic())
+
+            while len(self.entries) > self.max_entries:
+                self._evict(next(iter(self.entries)))
+
+    def invalidate(self):
+        """Drop every cached response (the underlying documents changed)"""
+        with self._lock:
+            self.index.reset()
+            self.entries.clear()
+            logger.info("Invalidated semantic query cache")
+
+    def _evict(self, entry_id: int):
+        self.index.remove_ids(np.array([entry_id], dtype=np.int64))
+        self.entries.pop(entry_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the cache"""
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds
+        }
+'''
+
+# document_store.py
+files_content['document_store.py'] = '''import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import List, Dict, Any, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class DocumentStore:
+    """SQLite storage for uploaded documents and their chunks"""
+
+    def __init__(self, db_path: str = "data/documents.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # One shared connection; writes are serialized by the lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = Lock()
+
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    upload_time TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL,
+                    status TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    doc_id TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    source TEXT
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks (doc_id)")
+
+        logger.info(f"Opened document store at {db_path}")
+
+    def add_document(self, document: Dict[str, Any], chunks: List[Dict[str, Any]]):
+        """Insert a document and its processed chunks in one transaction"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO documents (id, filename, upload_time, chunk_count, status) "
+                "VALUES (:id, :filename, :upload_time, :chunk_count, :status)",
+                document
+            )
+            # Rows are built straight from the chunk dicts, without merged copies
+            self.conn.executemany(
+                "INSERT INTO chunks (doc_id, chunk_id, content, source) VALUES (?, ?, ?, ?)",
+                ((document['id'], chunk['chunk_id'], chunk['content'], document['filename'])
+                 for chunk in chunks)
+            )
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document by id"""
+        row = self.conn.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """List all documents in upload order"""
+        rows = self.conn.execute("SELECT * FROM documents ORDER BY upload_time").fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_document(self, doc_id: str):
+        """Delete a document and its chunks"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def has_chunks(self) -> bool:
+        """Whether any chunk is stored"""
+        return self.conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone() is not None
+
+    def count_documents(self) -> int:
+        """Number of stored documents"""
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def count_chunks(self) -> int:
+        """Number of stored chunks"""
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+'''
+
+# embedding_cache.py
+files_content['embedding_cache.py'] = '''import sqlite3
+import hashlib
+from pathlib import Path
+from threading import Lock
+from typing import List, Dict, Tuple
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """SQLite store of chunk embeddings keyed by SHA-256 of the chunk text"""
+
+    # Stay below SQLite's default limit on bound parameters per statement
+    _QUERY_BATCH = 500
+
+    def __init__(self, db_path: str, model_name: str, dimension: int = 384):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.dimension = dimension
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = Lock()
+
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # Embeddings from different models are never mixed up
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, key)
+                )
+            """)
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Cache key for a chunk text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached embeddings for the keys that are present"""
+        found = {}
+        for start in range(0, len(keys), self._QUERY_BATCH):
+            batch = keys[start:start + self._QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                [self.model_name, *batch]
+            ).fetchall()
+
+            for key, vector in rows:
+                embedding = np.frombuffer(vector, dtype=np.float32)
+                if len(embedding) == self.dimension:
+                    found[key] = embedding
+        return found
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]):
+        """Store embeddings for the given keys"""
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+                    [(self.model_name, key, np.ascontiguousarray(embedding, dtype=np.float32).tobytes())
+                     for key, embedding in items]
+                )
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {str(e)}")
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+'''
+
 # Create files
 for filename, content in files_content.items():
     with open(filename, 'w') as f:
         f.write(content)
     print(f"✅ Created {filename}")
 
-print("Created document_processor.py and vector_store.py")
\ No newline at end of file
+print("Created document_processor.py, vector_store.py, semantic_cache.py, document_store.py and embedding_cache.py")
\ No newline at end of file
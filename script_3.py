@@ -4,23 +4,33 @@ files_content = {}
 
 # 4. llm_service.py
 files_content['llm_service.py'] = '''import os
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, AsyncIterator
+from functools import lru_cache
 import asyncio
 import logging
 import openai
 from openai import AsyncOpenAI
+from rank_bm25 import BM25Okapi
 import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=4096)
+def _sentence_index(chunk: str) -> Tuple[Tuple[str, ...], Optional[BM25Okapi]]:
+    """Split a chunk into sentences and build a BM25 index over their words"""
+    sentences = tuple(sentence for sentence in (s.strip() for s in chunk.split('.')) if sentence)
+    if not sentences:
+        return sentences, None
+    return sentences, BM25Okapi([sentence.lower().split() for sentence in sentences])
+
 class LLMService:
     """Service for generating responses using Large Language Models"""
-    
+
     def __init__(self):
         self.openai_client = None
         self.use_openai = False
-        
+
         # Check if OpenAI API key is available
         openai_api_key = os.getenv('OPENAI_API_KEY')
         if openai_api_key:
@@ -29,40 +39,67 @@ class LLMService:
             logger.info("OpenAI client initialized")
         else:
             logger.info("No OpenAI API key found, using fallback response generator")
-    
+
     async def generate_response(self, 
                               query: str, 
-                              context_chunks: List[Tuple[str, Dict[str, Any], float]]) -> str:
-        """Generate a response based on query and retrieved context"""
-        
+                              context_chunks: List[Tuple[str, Dict[str, Any], float]],
+                              max_chars: Optional[int] = None) -> str:
+        """Generate a response based on query and retrieved context, up to about max_chars"""
+
         if not context_chunks:
             return "I couldn't find relevant information to answer your question."
-        
+
         # Prepare context from retrieved chunks
         context = self._prepare_context(context_chunks)
-        
+
         if self.use_openai:
-            return await self._generate_openai_response(query, context)
+            return await self._generate_openai_response(query, context, self._max_tokens(max_chars))
         else:
             return await self._generate_fallback_response(query, context, context_chunks)
-    
+
+    async def generate_response_stream(self,
+                                       query: str,
+                                       context_chunks: List[Tuple[str, Dict[str, Any], float]]) -> AsyncIterator[str]:
+        """Yield the response incrementally as the model produces it"""
+
+        if not context_chunks:
+            yield "I couldn't find relevant information to answer your question."
+            return
+
+        context = self._prepare_context(context_chunks)
+
+        if self.use_openai:
+            async for token in self._stream_openai_response(query, context):
+                yield token
+        else:
+            yield await self._generate_fallback_response(query, context, context_chunks)
+
+    @staticmethod
+    def _max_tokens(max_chars: Optional[int]) -> int:
+        """Completion token budget for an answer of max_chars characters"""
+        if max_chars is None:
+            return 500
+        # English averages about four characters per token; budget for three
+        # so the answer rarely stops short of the cap
+        return min(500, max(1, -(-max_chars // 3)))
+
     def _prepare_context(self, context_chunks: List[Tuple[str, Dict[str, Any], float]]) -> str:
         """Prepare context string from retrieved chunks"""
-        
+
         context_parts = []
         for i, (text, metadata, score) in enumerate(context_chunks[:5]):  # Limit to top 5
             source = metadata.get('source', 'Unknown')
             chunk_id = metadata.get('chunk_id', 0)
-            
+
             context_parts.append(f"[Source {i+1}: {source}, Chunk {chunk_id}]\\n{text}\\n")
-        
+
         return "\\n".join(context_parts)
-    
-    async def _generate_openai_response(self, query: str, context: str) -> str:
-        """Generate response using OpenAI API"""
-        
+
+    def _build_messages(self, query: str, context: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a query and its context"""
+
         system_prompt = """You are a helpful AI assistant that answers questions based on provided context. 
-        
+
         Instructions:
         - Answer the question based ONLY on the provided context
         - If the context doesn't contain enough information, say so clearly
@@ -70,56 +107,84 @@ class LLMService:
         - Cite specific sources when making claims
         - If asked about something not in the context, politely decline and explain what information is available
         """
-        
+
         user_prompt = f"""Context:
 {context}
 
 Question: {query}
 
 Please provide a detailed answer based on the context above."""
-        
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    async def _generate_openai_response(self, query: str, context: str, max_tokens: int = 500) -> str:
+        """Generate response using OpenAI API"""
+
         try:
             response = await self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._build_messages(query, context),
                 temperature=0.3,
-                max_tokens=500
+                max_tokens=max_tokens
             )
-            
+
             return response.choices[0].message.content.strip()
-            
+
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             return f"Sorry, I encountered an error generating the response: {str(e)}"
-    
+
+    async def _stream_openai_response(self, query: str, context: str) -> AsyncIterator[str]:
+        """Stream response tokens from the OpenAI API as they arrive"""
+
+        try:
+            stream = await self.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=self._build_messages(query, context),
+                temperature=0.3,
+                max_tokens=500,
+                stream=True
+            )
+
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    yield token
+
+        except Exception as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            yield f"Sorry, I encountered an error generating the response: {str(e)}"
+
     async def _generate_fallback_response(self, 
                                         query: str, 
                                         context: str, 
                                         context_chunks: List[Tuple[str, Dict[str, Any], float]]) -> str:
         """Generate a fallback response using simple text processing"""
-        
+
         # Simple keyword-based response generation for demo purposes
         query_lower = query.lower()
-        
+
         # Find the most relevant chunk
         if context_chunks:
             best_chunk, best_metadata, best_score = context_chunks[0]
-            
-            # Extract key sentences from the best chunk
-            sentences = [s.strip() for s in best_chunk.split('.') if s.strip()]
-            
-            # Find sentences that contain query keywords
-            query_words = set(query_lower.split())
+
+            # Rank sentences containing query keywords with BM25 (indexed once per chunk)
+            query_tokens = query_lower.split()
+            query_words = frozenset(query_tokens)
+            sentences, bm25 = _sentence_index(best_chunk)
             relevant_sentences = []
-            
-            for sentence in sentences:
-                sentence_words = set(sentence.lower().split())
-                if query_words.intersection(sentence_words):
-                    relevant_sentences.append(sentence)
-            
+
+            if bm25 is not None and query_tokens:
+                scores = bm25.get_scores(query_tokens)
+                matched = [i for i, term_freqs in enumerate(bm25.doc_freqs)
+                           if not query_words.isdisjoint(term_freqs)]
+                # Best three matches, kept in document order
+                top = sorted(sorted(matched, key=lambda i: scores[i], reverse=True)[:3])
+                relevant_sentences = [sentences[i] for i in top]
+
             if relevant_sentences:
                 response = "Based on the available information:\\n\\n"
                 response += ". ".join(relevant_sentences[:3])  # Top 3 relevant sentences
@@ -132,16 +197,16 @@ Please provide a detailed answer based on the context above."""
                 response += f"\\n\\n(Relevance: {best_score:.2f})"
         else:
             response = "I couldn't find relevant information to answer your question in the uploaded documents."
-        
+
         # Add information about multiple sources if available
         if len(context_chunks) > 1:
             sources = [metadata.get('source', 'Unknown') for _, metadata, _ in context_chunks[:3]]
             unique_sources = list(set(sources))
             if len(unique_sources) > 1:
                 response += f"\\n\\nInformation was found across {len(unique_sources)} sources: {', '.join(unique_sources)}"
-        
+
         return response
-    
+
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model configuration"""
         return {
@@ -156,6 +221,7 @@ fastapi==0.104.1
 uvicorn[standard]==0.24.0
 python-multipart==0.0.6
 aiofiles==23.2.1
+orjson==3.9.10
 
 # Document processing
 PyMuPDF==1.23.8
@@ -165,8 +231,9 @@ langchain-text-splitters==0.0.1
 
 # Vector database and embeddings
 sentence-transformers==2.2.2
-faiss-cpu==1.7.4
+faiss-cpu==1.8.0  # or faiss-gpu on CUDA hosts for GPU search
 numpy==1.24.4
+rank-bm25==0.2.2
 
 # LLM integration
 openai==1.3.5
@@ -179,6 +246,9 @@ pathlib2==2.3.7.post1
 # Optional: For better PDF processing
 pdfplumber==0.10.3
 
+# Optional: ONNX Runtime embedding backend
+onnxruntime==1.16.3
+
 # Development and testing (optional)
 pytest==7.4.3
 pytest-asyncio==0.21.1
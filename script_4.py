@@ -3,7 +3,8 @@
 files_content = {}
 
 # 6. Dockerfile
-files_content['Dockerfile'] = '''# Multi-stage build for optimized production image
+files_content['Dockerfile'] = '''# syntax=docker/dockerfile:1.4
+# Multi-stage build for optimized production image
 FROM python:3.9-slim as builder
 
 # Install system dependencies for building packages
@@ -15,9 +16,11 @@ RUN apt-get update && apt-get install -y \\
 # Set working directory
 WORKDIR /app
 
-# Copy requirements and install Python dependencies
+# Copy requirements and install Python dependencies; the BuildKit cache mount
+# keeps downloaded wheels across builds without adding them to any layer
 COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
+RUN --mount=type=cache,target=/root/.cache/pip \\
+    pip install --no-warn-script-location -r requirements.txt
 
 # Production stage
 FROM python:3.9-slim
@@ -56,7 +59,7 @@ HEALTHCHECK --interval=30s --timeout=10s --start-period=30s --retries=3 \\
     CMD curl -f http://localhost:8000/health || exit 1
 
 # Run the application
-CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000", "--workers", "1"]'''
+CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000", "--workers", "1", "--loop", "uvloop", "--http", "httptools"]'''
 
 # 7. docker-compose.yml
 files_content['docker-compose.yml'] = '''version: '3.8'
@@ -75,11 +78,14 @@ services:
       - ENVIRONMENT=production
     restart: unless-stopped
     healthcheck:
-      test: ["CMD", "curl", "-f", "http://localhost:8000/health"]
+      test: ["CMD", "curl", "-fsS", "http://localhost:8000/health"]
       interval: 30s
       timeout: 10s
-      retries: 3
+      retries: 5
       start_period: 30s
+      # Probe every second while starting so `up --wait` returns as soon as it is ready
+      # (start_interval needs Docker Compose v2.20+ and Docker Engine 25+)
+      start_interval: 1s
     networks:
       - rag-network
 
@@ -93,6 +99,13 @@ services:
     depends_on:
       - rag-api
     restart: unless-stopped
+    healthcheck:
+      test: ["CMD", "wget", "-q", "--spider", "http://localhost/"]
+      interval: 30s
+      timeout: 10s
+      retries: 5
+      start_period: 30s
+      start_interval: 1s
     networks:
       - rag-network
 
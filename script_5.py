@@ -1,4 +1,6 @@
 # Create environment and configuration files
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 files_content = {}
 
@@ -14,10 +16,21 @@ ENVIRONMENT=development
 
 # Embedding Model Configuration
 EMBEDDING_MODEL=all-MiniLM-L6-v2
+# Optional ONNX Runtime export of the model (INT8 model.int8.onnx is preferred), e.g.
+#   optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 --task feature-extraction --optimize O2 data/onnx-minilm
+#   python -c "from onnxruntime.quantization import quantize_dynamic, QuantType; quantize_dynamic('data/onnx-minilm/model.onnx', 'data/onnx-minilm/model.int8.onnx', weight_type=QuantType.QInt8)"
+EMBEDDING_ONNX_PATH=
 
 # Vector Store Configuration
 VECTOR_INDEX_PATH=data/vector_index.faiss
-VECTOR_METADATA_PATH=data/vector_metadata.pkl
+VECTOR_METADATA_PATH=data/vector_metadata.jsonl
+# SHA-256 keyed chunk embedding cache
+EMBEDDING_CACHE_PATH=data/embeddings.db
+# Index type: hnsw (default), flat (exact), sq8 (int8 quantized), or ivfpq (for large stores)
+VECTOR_INDEX_TYPE=hnsw
+
+# Document and chunk metadata (SQLite)
+DOCUMENT_DB_PATH=data/documents.db
 
 # Document Processing
 MAX_CHUNK_SIZE=1000
@@ -119,6 +132,12 @@ files_content['start.sh'] = '''#!/bin/bash
 
 set -e
 
+# Pass --clean to rebuild images without the layer cache
+BUILD_ARGS=""
+if [ "$1" = "--clean" ]; then
+    BUILD_ARGS="--no-cache"
+fi
+
 echo "🔍 RAG Knowledge Base - Quick Start"
 echo "=================================="
 
@@ -136,47 +155,90 @@ if ! command -v docker-compose &> /dev/null; then
     exit 1
 fi
 
-# Create .env file if it doesn't exist
-if [ ! -f .env ]; then
-    echo "📝 Creating environment file..."
-    cp .env.template .env
-    echo "✅ Created .env file from template"
-    echo "💡 You can edit .env to add your OpenAI API key (optional)"
+# The healthchecks use start_interval, which Compose only parses from v2.20
+COMPOSE_VERSION=$(docker-compose version --short 2>/dev/null | sed 's/^v//')
+IFS=. read -r COMPOSE_MAJOR COMPOSE_MINOR _ <<< "$COMPOSE_VERSION"
+if (( ${COMPOSE_MAJOR:-0} < 2 || (${COMPOSE_MAJOR:-0} == 2 && ${COMPOSE_MINOR:-0} < 20) )); then
+    echo "❌ Docker Compose ${COMPOSE_VERSION:-unknown} is too old; version 2.20 or newer is required:"
+    echo "   https://docs.docker.com/compose/install/"
+    exit 1
+fi
+
+# Poll a URL until it answers: every 0.2s for the first 5s, then every second, for up to 60s
+wait_for() {
+    local url=$1
+    local start=$SECONDS
+    local deadline=$((SECONDS + 60))
+    while (( SECONDS < deadline )); do
+        # HEAD only: readiness needs the status, not the body
+        if curl -sfI "$url" > /dev/null 2>&1; then
+            return 0
+        fi
+        if (( SECONDS - start < 5 )); then
+            sleep 0.2
+        else
+            sleep 1
+        fi
+    done
+    return 1
+}
+
+# Create .env file and necessary directories (shared with start.bat);
+# fall back to the shell when no Python is installed on the host
+if command -v python3 &> /dev/null; then
+    python3 bootstrap.py
+elif command -v python &> /dev/null; then
+    python bootstrap.py
+else
+    [ -f .env ] || { cp .env.template .env && echo "✅ Created .env file from template"; }
+    mkdir -p uploads data logs
+    echo "✅ Directories created"
 fi
 
-# Create necessary directories
-echo "📁 Creating directories..."
-mkdir -p uploads data logs
-echo "✅ Directories created"
+# Skip the teardown and rebuild when nothing that goes into the images or their
+# environment (.env) changed and the stack is still running
+HASH_FILE=.start-cache-hash
+HASH=$(cat docker-compose.yml Dockerfile requirements.txt nginx.conf frontend.html .env *.py 2>/dev/null \\
+    | { sha256sum 2>/dev/null || shasum -a 256; } | cut -d' ' -f1)
+if [ -z "$BUILD_ARGS" ] && [ -f "$HASH_FILE" ] && [ "$(cat "$HASH_FILE")" = "$HASH" ] \\
+    && docker-compose ps --services --filter "status=running" 2>/dev/null | grep -qx rag-api; then
+    echo "✅ Stack already up and up-to-date; skipping rebuild."
+    echo "🌐 Web Interface:    http://localhost"
+    exit 0
+fi
+rm -f "$HASH_FILE"
 
 # Build and start the services
 echo "🚀 Building and starting services..."
 docker-compose down --remove-orphans 2>/dev/null || true
-docker-compose build --no-cache
-docker-compose up -d
+# BuildKit reuses cached layers, so dependencies reinstall only when requirements.txt changes;
+# --parallel builds services side by side when more than one has a build context
+export DOCKER_BUILDKIT=1
+export COMPOSE_DOCKER_CLI_BUILD=1
+docker-compose build --parallel $BUILD_ARGS
 
 # Wait for services to be ready
 echo "⏳ Waiting for services to start..."
-sleep 10
+# Returns once every healthcheck passes (probed each second while starting)
+if ! docker-compose up -d --wait --wait-timeout 90; then
+    echo "❌ Services failed to become healthy"
+    echo "📋 Checking logs:"
+    docker-compose logs rag-api nginx
+    exit 1
+fi
 
-# Check if services are healthy
 echo "🔍 Checking service health..."
-for i in {1..30}; do
-    if curl -s http://localhost:8000/health > /dev/null 2>&1; then
-        echo "✅ Backend service is healthy"
-        break
-    fi
-    if [ $i -eq 30 ]; then
-        echo "❌ Backend service failed to start"
-        echo "📋 Checking logs:"
-        docker-compose logs rag-api
-        exit 1
-    fi
-    sleep 2
-done
+if wait_for http://localhost:8000/health; then
+    echo "✅ Backend service is healthy"
+else
+    echo "❌ Backend service failed to start"
+    echo "📋 Checking logs:"
+    docker-compose logs rag-api
+    exit 1
+fi
 
 # Check if frontend is accessible
-if curl -s http://localhost > /dev/null 2>&1; then
+if wait_for http://localhost; then
     echo "✅ Frontend service is healthy"
 else
     echo "❌ Frontend service is not accessible"
@@ -185,6 +247,9 @@ else
     exit 1
 fi
 
+# Remember what this stack was built from
+echo "$HASH" > "$HASH_FILE"
+
 echo ""
 echo "🎉 RAG Knowledge Base is now running!"
 echo "=================================="
@@ -209,6 +274,10 @@ echo "💡 Tip: Edit .env file to add your OpenAI API key for better responses"'
 files_content['start.bat'] = '''@echo off
 REM RAG Knowledge Base - Quick Start Script for Windows
 
+REM Pass --clean to rebuild images without the layer cache
+set BUILD_ARGS=
+if /i "%~1"=="--clean" set BUILD_ARGS=--no-cache
+
 echo.
 echo 🔍 RAG Knowledge Base - Quick Start
 echo ==================================
@@ -231,54 +300,115 @@ if errorlevel 1 (
     exit /b 1
 )
 
-REM Create .env file if it doesn't exist
-if not exist .env (
-    echo 📝 Creating environment file...
-    copy .env.template .env
-    echo ✅ Created .env file from template
-    echo 💡 You can edit .env to add your OpenAI API key optional
+REM The healthchecks use start_interval, which Compose only parses from v2.20
+set COMPOSE_MAJOR=0
+set COMPOSE_MINOR=0
+for /f "tokens=1,2 delims=v." %%a in ('docker-compose version --short 2^>nul') do (
+    set COMPOSE_MAJOR=%%a
+    set COMPOSE_MINOR=%%b
+)
+set COMPOSE_TOO_OLD=
+if %COMPOSE_MAJOR% lss 2 set COMPOSE_TOO_OLD=1
+if %COMPOSE_MAJOR% equ 2 if %COMPOSE_MINOR% lss 20 set COMPOSE_TOO_OLD=1
+if defined COMPOSE_TOO_OLD (
+    echo ❌ Docker Compose is too old; version 2.20 or newer is required:
+    echo    https://docs.docker.com/compose/install/
+    pause
+    exit /b 1
+)
+
+REM Create .env file and necessary directories (shared with start.sh);
+REM fall back to cmd when no Python is installed on the host
+python bootstrap.py 2>nul
+if errorlevel 1 (
+    if not exist .env copy .env.template .env >nul
+    for %%d in (uploads data logs) do if not exist %%d mkdir %%d
+    echo ✅ Directories created
 )
 
-REM Create necessary directories
-echo 📁 Creating directories...
-if not exist uploads mkdir uploads
-if not exist data mkdir data
-if not exist logs mkdir logs
-echo ✅ Directories created
+REM Skip the teardown and rebuild when nothing that goes into the images or their
+REM environment (.env) changed and the stack is still running
+set HASH=
+set HASH_INPUT=%TEMP%\\rag-start-hash-input.tmp
+copy /b docker-compose.yml+Dockerfile+requirements.txt+nginx.conf+frontend.html+.env+*.py "%HASH_INPUT%" >nul 2>&1
+for /f "skip=1 delims=" %%h in ('certutil -hashfile "%HASH_INPUT%" SHA256') do if not defined HASH set HASH=%%h
+del "%HASH_INPUT%" >nul 2>&1
+set CACHED_HASH=
+if exist .start-cache-hash set /p CACHED_HASH=<.start-cache-hash
+if not defined BUILD_ARGS if defined HASH if "%CACHED_HASH%"=="%HASH%" (
+    docker-compose ps --services --filter "status=running" 2>nul | findstr /x rag-api >nul
+    if not errorlevel 1 (
+        echo ✅ Stack already up and up-to-date; skipping rebuild.
+        echo 🌐 Web Interface:      http://localhost
+        exit /b 0
+    )
+)
+if exist .start-cache-hash del .start-cache-hash
 
 REM Build and start the services
 echo 🚀 Building and starting services...
 docker-compose down --remove-orphans >nul 2>&1
-docker-compose build --no-cache
-docker-compose up -d
-
-REM Wait for services to be ready
+REM BuildKit reuses cached layers, so dependencies reinstall only when requirements.txt changes;
+REM --parallel builds services side by side when more than one has a build context
+set DOCKER_BUILDKIT=1
+set COMPOSE_DOCKER_CLI_BUILD=1
+docker-compose build --parallel %BUILD_ARGS%
+
+REM Wait for services to be ready: compose returns once every healthcheck
+REM passes (probed each second while starting), then the probes below confirm
 echo ⏳ Waiting for services to start...
-timeout /t 10 /nobreak >nul
-
-REM Check if services are healthy
-echo 🔍 Checking service health...
-curl -s http://localhost:8000/health >nul 2>&1
+docker-compose up -d --wait --wait-timeout 90
 if errorlevel 1 (
-    echo ❌ Backend service failed to start
+    echo ❌ Services failed to become healthy
     echo 📋 Checking logs:
-    docker-compose logs rag-api
+    docker-compose logs rag-api nginx
     pause
     exit /b 1
 )
+echo 🔍 Checking service health...
+set ATTEMPTS=0
+:wait_backend
+curl -sfI http://localhost:8000/health >nul 2>&1
+if not errorlevel 1 goto backend_ready
+set /a ATTEMPTS+=1
+if %ATTEMPTS% geq 120 goto backend_failed
+REM Half-second delay (ping -w is unreliable: it returns at once when there is no route)
+powershell -NoProfile -Command Start-Sleep -Milliseconds 500
+goto wait_backend
+
+:backend_failed
+echo ❌ Backend service failed to start
+echo 📋 Checking logs:
+docker-compose logs rag-api
+pause
+exit /b 1
+
+:backend_ready
 echo ✅ Backend service is healthy
 
 REM Check if frontend is accessible
-curl -s http://localhost >nul 2>&1
-if errorlevel 1 (
-    echo ❌ Frontend service is not accessible
-    echo 📋 Checking logs:
-    docker-compose logs nginx
-    pause
-    exit /b 1
-)
+set ATTEMPTS=0
+:wait_frontend
+curl -sfI http://localhost >nul 2>&1
+if not errorlevel 1 goto frontend_ready
+set /a ATTEMPTS+=1
+if %ATTEMPTS% geq 120 goto frontend_failed
+powershell -NoProfile -Command Start-Sleep -Milliseconds 500
+goto wait_frontend
+
+:frontend_failed
+echo ❌ Frontend service is not accessible
+echo 📋 Checking logs:
+docker-compose logs nginx
+pause
+exit /b 1
+
+:frontend_ready
 echo ✅ Frontend service is healthy
 
+REM Remember what this stack was built from
+if defined HASH echo %HASH%> .start-cache-hash
+
 echo.
 echo 🎉 RAG Knowledge Base is now running!
 echo ==================================
@@ -301,10 +431,49 @@ echo 💡 Tip: Edit .env file to add your OpenAI API key for better responses
 echo.
 pause'''
 
-# Create files
-for filename, content in files_content.items():
-    with open(filename, 'w') as f:
-        f.write(content)
-    print(f"✅ Created {filename}")
+# 13. bootstrap.py (local setup shared by start.sh and start.bat)
+files_content['bootstrap.py'] = '''#!/usr/bin/env python3
+"""
+Idempotent local setup shared by start.sh and start.bat:
+creates the data directories and seeds .env from the template
+"""
+
+import os
+import shutil
+
+DIRECTORIES = ("uploads", "data", "logs")
+
+def main():
+    if not os.path.exists(".env") and os.path.exists(".env.template"):
+        print("📝 Creating environment file...")
+        shutil.copyfile(".env.template", ".env")
+        print("✅ Created .env file from template")
+        print("💡 You can edit .env to add your OpenAI API key (optional)")
+
+    print("📁 Creating directories...")
+    for directory in DIRECTORIES:
+        os.makedirs(directory, exist_ok=True)
+    print("✅ Directories created")
+
+if __name__ == "__main__":
+    main()
+'''
+
+# Create files: encode once and write with a single syscall per file,
+# translating newlines as text mode would
+def _write(item):
+    filename, content = item
+    data = content.replace("\n", os.linesep).encode('utf-8')
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    return filename
+
+# Files are independent, so overlap their writes (the GIL is released in os.write)
+with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+    for filename in pool.map(_write, files_content.items()):
+        print(f"✅ Created {filename}")
 
 print("Created environment and startup files")
\ No newline at end of file
@@ -1,4 +1,6 @@
 # Create the remaining files
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 files_content = {}
 
@@ -11,180 +13,204 @@ Tests basic functionality without requiring external dependencies
 
 import asyncio
 import aiohttp
-import json
+import io
+import orjson
+import textwrap
 import time
-from pathlib import Path
 
 BASE_URL = "http://localhost:8000"
 
-async def test_health_check():
-    """Test if the API is responding"""
-    print("🔍 Testing health check...")
-    
-    async with aiohttp.ClientSession() as session:
+async def wait_ready(session, deadline=30.0):
+    """Poll the health endpoint with HEAD and backoff, returning (ready: bool, last_error)"""
+    start = time.monotonic()
+    delay = 0.1
+    last_error = None
+
+    while time.monotonic() - start < deadline:
         try:
-            async with session.get(f"{BASE_URL}/health") as response:
+            async with session.head(f"{BASE_URL}/health", timeout=aiohttp.ClientTimeout(total=1)) as response:
                 if response.status == 200:
-                    data = await response.json()
-                    print(f"✅ Health check passed: {data}")
-                    return True
-                else:
-                    print(f"❌ Health check failed with status {response.status}")
-                    return False
+                    return True, None
+                last_error = f"status {response.status}"
         except Exception as e:
-            print(f"❌ Health check failed: {e}")
+            last_error = e
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+    return False, last_error
+
+async def test_health_check(session):
+    """Test if the API is responding, waiting for it to become ready"""
+    print("🔍 Testing health check...")
+
+    ready, error = await wait_ready(session)
+    if not ready:
+        print(f"❌ Health check failed: {error}")
+        return False
+
+    # Verify the full response shape once the server is up
+    try:
+        async with session.get(f"{BASE_URL}/health") as response:
+            data = await response.json(loads=orjson.loads)
+            if response.status == 200 and data.get("status") == "healthy":
+                print(f"✅ Health check passed: {data}")
+                return True
+            print(f"❌ Health check failed with status {response.status}: {data}")
             return False
+    except Exception as e:
+        print(f"❌ Health check failed: {e}")
+        return False
 
-async def test_document_upload():
+async def test_document_upload(session):
     """Test document upload functionality"""
     print("📄 Testing document upload...")
-    
-    # Create a test document
-    test_doc_path = Path("test_document.txt")
+
+    # Test document, uploaded straight from memory
     test_content = """
     This is a test document for the RAG system.
-    
+
     The system should be able to process this document and answer questions about it.
-    
+
     Key information:
     - This document was created for testing purposes
     - It contains multiple paragraphs and sections
     - The RAG system uses this content to generate responses
     - Vector embeddings are created from this text
-    
+
     Technical details:
     - The document processing pipeline extracts text
     - Text is chunked into smaller pieces
     - Each chunk is converted to vector embeddings
     - Embeddings are stored in a FAISS index
-    
+
     This allows for semantic search and intelligent question answering.
     """
-    
-    with open(test_doc_path, 'w') as f:
-        f.write(test_content)
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            with open(test_doc_path, 'rb') as file:
-                form_data = aiohttp.FormData()
-                form_data.add_field('file', file, filename='test_document.txt', content_type='text/plain')
-                
-                async with session.post(f"{BASE_URL}/upload", data=form_data) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Document upload successful: {data}")
-                        return data.get('doc_id')
-                    else:
-                        error_data = await response.text()
-                        print(f"❌ Document upload failed with status {response.status}: {error_data}")
-                        return None
-        except Exception as e:
-            print(f"❌ Document upload failed: {e}")
-            return None
-        finally:
-            # Clean up test file
-            if test_doc_path.exists():
-                test_doc_path.unlink()
-
-async def test_query():
+
+    try:
+        # Streamed multipart body: the payload is read from the file object in chunks
+        writer = aiohttp.MultipartWriter('form-data')
+        part = writer.append(io.BytesIO(test_content.encode('utf-8')), {'Content-Type': 'text/plain'})
+        part.set_content_disposition('form-data', name='file', filename='test_document.txt')
+
+        async with session.post(f"{BASE_URL}/upload", data=writer) as response:
+            if response.status == 200:
+                data = await response.json()
+                print(f"✅ Document upload successful: {data}")
+                return data.get('doc_id')
+            else:
+                error_data = await response.text()
+                print(f"❌ Document upload failed with status {response.status}: {error_data}")
+                return None
+    except Exception as e:
+        print(f"❌ Document upload failed: {e}")
+        return None
+
+async def test_query(session):
     """Test query functionality"""
     print("❓ Testing query...")
-    
+
     test_query = "What is this document about?"
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            query_data = {
-                "query": test_query,
-                "top_k": 3
-            }
-            
-            headers = {"Content-Type": "application/json"}
-            
-            async with session.post(f"{BASE_URL}/query", 
-                                  data=json.dumps(query_data), 
-                                  headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print(f"✅ Query successful!")
-                    print(f"📝 Response: {data['response'][:200]}...")
-                    print(f"📚 Found {len(data['sources'])} sources")
-                    return True
-                else:
-                    error_data = await response.text()
-                    print(f"❌ Query failed with status {response.status}: {error_data}")
-                    return False
-        except Exception as e:
-            print(f"❌ Query failed: {e}")
-            return False
 
-async def test_list_documents():
+    try:
+        query_data = {
+            "query": test_query,
+            "top_k": 3,
+            "max_chars": 256  # Only a preview is printed
+        }
+
+        headers = {"Content-Type": "application/json"}
+
+        async with session.post(f"{BASE_URL}/query", 
+                              data=orjson.dumps(query_data), 
+                              headers=headers) as response:
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                print(f"✅ Query successful!")
+                print(f"📝 Response: {textwrap.shorten(data['response'], width=200, placeholder='...')}")
+                print(f"📚 Found {len(data['sources'])} sources")
+                return True
+            else:
+                error_data = await response.text()
+                print(f"❌ Query failed with status {response.status}: {error_data}")
+                return False
+    except Exception as e:
+        print(f"❌ Query failed: {e}")
+        return False
+
+async def test_list_documents(session):
     """Test document listing"""
     print("📋 Testing document listing...")
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(f"{BASE_URL}/documents") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print(f"✅ Document listing successful: Found {len(data)} documents")
-                    return data
-                else:
-                    error_data = await response.text()
-                    print(f"❌ Document listing failed with status {response.status}: {error_data}")
-                    return None
-        except Exception as e:
-            print(f"❌ Document listing failed: {e}")
-            return None
+
+    try:
+        async with session.get(f"{BASE_URL}/documents") as response:
+            if response.status == 200:
+                data = await response.json()
+                print(f"✅ Document listing successful: Found {len(data)} documents")
+                return data
+            else:
+                error_data = await response.text()
+                print(f"❌ Document listing failed with status {response.status}: {error_data}")
+                return None
+    except Exception as e:
+        print(f"❌ Document listing failed: {e}")
+        return None
+
+async def test_upload_and_query(session):
+    """Upload the test document, then query it if the upload succeeded"""
+    doc_id = await test_document_upload(session)
+    if not doc_id:
+        print("⏭️ Skipping query test (upload failed)")
+        return None, False
+    return doc_id, await test_query(session)
 
 async def run_all_tests():
     """Run all tests"""
     print("🚀 Starting RAG Knowledge Base Tests")
     print("=" * 50)
-    
-    # Wait a moment for system to be ready
-    print("⏳ Waiting for system to be ready...")
-    await asyncio.sleep(2)
-    
+
     tests_passed = 0
     total_tests = 4
-    
-    # Test 1: Health check
-    if await test_health_check():
-        tests_passed += 1
-    
-    print()
-    
-    # Test 2: Document upload
-    doc_id = await test_document_upload()
-    if doc_id:
-        tests_passed += 1
-    
-    print()
-    
-    # Test 3: Query (only if upload succeeded)
-    if doc_id:
-        if await test_query():
+
+    # One pooled session for every request (reuses TCP connections and DNS)
+    connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # Test 1: Health check, retried until the system is ready
+        print("⏳ Waiting for system to be ready...")
+        if await test_health_check(session):
             tests_passed += 1
-    else:
-        print("⏭️ Skipping query test (upload failed)")
-    
-    print()
-    
-    # Test 4: List documents
-    if await test_list_documents():
-        tests_passed += 1
-    
+
+        print()
+
+        # Listing doesn't depend on the upload, so run it alongside the
+        # upload -> query chain (structured concurrency on Python 3.11+)
+        if hasattr(asyncio, "TaskGroup"):
+            async with asyncio.TaskGroup() as tg:
+                list_task = tg.create_task(test_list_documents(session))
+                chain_task = tg.create_task(test_upload_and_query(session))
+            documents, (doc_id, query_ok) = list_task.result(), chain_task.result()
+        else:
+            documents, (doc_id, query_ok) = await asyncio.gather(
+                test_list_documents(session), test_upload_and_query(session))
+
+        if doc_id:
+            tests_passed += 1
+        if query_ok:
+            tests_passed += 1
+        # An empty list is a valid listing
+        if isinstance(documents, list):
+            tests_passed += 1
+
     print()
     print("=" * 50)
     print(f"📊 Test Results: {tests_passed}/{total_tests} tests passed")
-    
+
     if tests_passed == total_tests:
         print("🎉 All tests passed! Your RAG system is working correctly.")
     else:
         print("❌ Some tests failed. Check the output above for details.")
-    
+
     return tests_passed == total_tests
 
 if __name__ == "__main__":
@@ -198,6 +224,31 @@ if __name__ == "__main__":
         print(f"❌ Test runner failed: {e}")
         exit(1)'''
 
+# Splitter unit tests
+files_content['test_document_processor.py'] = '''from document_processor import fast_split
+
+
+def test_fast_split_hard_cuts_before_unbreakable_run():
+    """A long token without breaks must not make each window advance by one word"""
+    text = "word " * 50 + "z" * 1500
+
+    chunks = fast_split(text, chunk_size=1000, chunk_overlap=200)
+
+    assert [len(chunk) for chunk in chunks] == [249, 999, 501]
+    assert "".join(chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_fast_split_keeps_overlap_for_full_windows():
+    """Windows cut in their second half still repeat the overlap"""
+    text = " ".join(f"w{i}" for i in range(400))
+
+    chunks = fast_split(text, chunk_size=1000, chunk_overlap=200)
+
+    assert len(chunks) == 3
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert chunks[1].split()[0] in chunks[0].split()
+'''
+
 # Demo document
 files_content['demo_document.md'] = '''# Machine Learning Fundamentals
 
@@ -318,10 +369,21 @@ Machine learning continues to evolve rapidly, offering new opportunities to solv
 
 The key to successful machine learning projects is combining domain expertise, high-quality data, appropriate algorithms, and careful evaluation of results.'''
 
-# Create files
-for filename, content in files_content.items():
-    with open(filename, 'w') as f:
-        f.write(content)
-    print(f"✅ Created {filename}")
+# Create files: encode once and write with a single syscall per file,
+# translating newlines as text mode would
+def _write(item):
+    filename, content = item
+    data = content.replace("\n", os.linesep).encode('utf-8')
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    return filename
+
+# Files are independent, so overlap their writes (the GIL is released in os.write)
+with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+    for filename in pool.map(_write, files_content.items()):
+        print(f"✅ Created {filename}")
 
-print("Created test script and demo document")
\ No newline at end of file
+print("Created test scripts and demo document")
\ No newline at end of file
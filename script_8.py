@@ -268,7 +268,7 @@ Content-Security-Policy: default-src 'self'...
    - 4GB+ RAM (8GB recommended)
    - 2+ CPU cores
    - 20GB+ storage
-   - Docker & Docker Compose
+   - Docker Engine 25+ & Docker Compose v2.20+
 
 2. **Domain Setup**
    ```bash
@@ -1,6 +1,8 @@
 # Create the final ZIP package with all files
 import zipfile
 import os
+import shutil
+import sys
 from pathlib import Path
 
 # List of all files to include in the ZIP
@@ -9,6 +11,9 @@ files_to_zip = [
     "document_processor.py", 
     "vector_store.py",
     "llm_service.py",
+    "semantic_cache.py",
+    "document_store.py",
+    "embedding_cache.py",
     "requirements.txt",
     "frontend.html",
     "Dockerfile",
@@ -19,21 +24,24 @@ files_to_zip = [
     "README.md",
     "start.sh",
     "start.bat",
+    "bootstrap.py",
     "test_rag_system.py",
+    "test_document_processor.py",
     "demo_document.md"
 ]
 
-# Check which files exist
-existing_files = []
-missing_files = []
+# Check which files exist with one directory scan instead of a stat per file
+wanted = frozenset(files_to_zip)
+with os.scandir('.') as entries:
+    present = {entry.name: entry for entry in entries if entry.name in wanted and entry.is_file()}
 
-for file_path in files_to_zip:
-    if os.path.exists(file_path):
-        existing_files.append(file_path)
-        print(f"✅ {file_path}")
-    else:
-        missing_files.append(file_path)
-        print(f"❌ {file_path}")
+existing_files = [file_path for file_path in files_to_zip if file_path in present]
+missing_files = [file_path for file_path in files_to_zip if file_path not in present]
+
+# One write for the whole status listing instead of a print per file
+sys.stdout.write("".join(
+    f"✅ {file_path}\n" if file_path in present else f"❌ {file_path}\n" for file_path in files_to_zip
+))
 
 print(f"\n📊 Files Status:")
 print(f"✅ Existing: {len(existing_files)}")
@@ -45,10 +53,29 @@ if missing_files:
 # Create the ZIP file with existing files
 zip_filename = "rag-knowledge-base-complete.zip"
 
-with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
+# Level 1 DEFLATE: near level-6 size on text at a fraction of the CPU
+STORE_BELOW = 4 * 1024  # Tiny files: header + CRC costs less than compressing
+COPY_BUFFER = 1 << 20   # 1 MiB reads instead of ZipFile.write's 8 KiB
+
+with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
     for file_path in existing_files:
-        zipf.write(file_path, file_path)
-        print(f"📦 Added {file_path} to ZIP")
+        info = zipfile.ZipInfo.from_file(file_path, file_path)
+        size = present[file_path].stat().st_size
+        info.compress_type = zipfile.ZIP_STORED if size < STORE_BELOW else zipfile.ZIP_DEFLATED
+        with open(file_path, 'rb') as src:
+            if size <= COPY_BUFFER:
+                # Fits in one buffer: a single read, and writestr is the only
+                # public way to give an entry the archive's level-1 setting
+                zipf.writestr(info, src.read(), compresslevel=zipf.compresslevel)
+            else:
+                # Stream larger files in 1 MiB chunks at zlib's default level
+                with zipf.open(info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER)
+
+    # Entries written through this handle; no need to reopen the archive
+    zip_entries = zipf.infolist()
+
+print(f"📦 Added {len(existing_files)} files to ZIP")
 
 # Get ZIP file size
 zip_size = os.path.getsize(zip_filename)
@@ -57,38 +84,41 @@ print(f"📏 ZIP file size: {zip_size / 1024:.1f} KB")
 
 # Verify ZIP contents
 print(f"\n📋 ZIP Contents:")
-with zipfile.ZipFile(zip_filename, 'r') as zipf:
-    file_list = zipf.namelist()
-    for file_name in sorted(file_list):
-        file_info = zipf.getinfo(file_name)
-        print(f"  📄 {file_name} ({file_info.file_size} bytes)")
-
-print(f"\n🎉 Ready for GitHub upload!")
-print(f"📥 Download: {zip_filename}")
-print(f"📊 Total files in ZIP: {len(file_list)}")
+file_list = [file_info.filename for file_info in zip_entries]
+sys.stdout.write("".join(
+    f"  📄 {file_info.filename} ({file_info.file_size} bytes)\n"
+    for file_info in sorted(zip_entries, key=lambda info: info.filename)
+))
 
-# Create upload instructions
-print(f"\n🚀 GitHub Upload Instructions:")
-print("=" * 50)
-print("1. Download the ZIP file from the output")
-print("2. Create a new GitHub repository")
-print("3. Extract all files from the ZIP")
-print("4. Upload all extracted files to your GitHub repository")
-print("5. Your complete RAG system is ready!")
-print("")
-print("🌟 Key Features of Your RAG System:")
-print("- Complete FastAPI backend with document processing")
-print("- Modern web frontend with drag-and-drop upload")
-print("- Vector database with FAISS and sentence-transformers")
-print("- OpenAI integration with intelligent fallback")
-print("- Docker deployment with Nginx reverse proxy")
-print("- Comprehensive documentation and testing")
-print("- Production-ready with security and monitoring")
-print("")
-print("🚀 Quick Start After Upload:")
-print("1. Clone your repository")
-print("2. Run: chmod +x start.sh (Linux/macOS)")
-print("3. Run: ./start.sh")
-print("4. Open: http://localhost")
-print("")
-print("✨ Your RAG Knowledge Base system is ready for deployment!")
\ No newline at end of file
+# Summary and instructions, written in one call
+summary_lines = [
+    "\n🎉 Ready for GitHub upload!",
+    f"📥 Download: {zip_filename}",
+    f"📊 Total files in ZIP: {len(file_list)}",
+    # Upload instructions
+    "\n🚀 GitHub Upload Instructions:",
+    "=" * 50,
+    "1. Download the ZIP file from the output",
+    "2. Create a new GitHub repository",
+    "3. Extract all files from the ZIP",
+    "4. Upload all extracted files to your GitHub repository",
+    "5. Your complete RAG system is ready!",
+    "",
+    "🌟 Key Features of Your RAG System:",
+    "- Complete FastAPI backend with document processing",
+    "- Modern web frontend with drag-and-drop upload",
+    "- Vector database with FAISS and sentence-transformers",
+    "- OpenAI integration with intelligent fallback",
+    "- Docker deployment with Nginx reverse proxy",
+    "- Comprehensive documentation and testing",
+    "- Production-ready with security and monitoring",
+    "",
+    "🚀 Quick Start After Upload:",
+    "1. Clone your repository",
+    "2. Run: chmod +x start.sh (Linux/macOS)",
+    "3. Run: ./start.sh",
+    "4. Open: http://localhost",
+    "",
+    "✨ Your RAG Knowledge Base system is ready for deployment!",
+]
+sys.stdout.write("\n".join(summary_lines) + "\n")
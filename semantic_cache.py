@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import List, Dict, Any, Optional
+import numpy as np
+import faiss
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """LRU cache of query responses, matched by query embedding similarity"""
+
+    def __init__(self,
+                 dimension: int = 384,
+                 max_entries: int = 1024,
+                 ttl_seconds: float = 600,
+                 candidates: int = 4):
+
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.candidates = candidates  # Nearest cached queries checked per lookup
+
+        # Query embeddings keyed by entry id, so evicted entries can be removed
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+
+        # entry id -> (top_k, response, sources, timestamp), oldest first
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._lock = RLock()
+
+    def lookup(self,
+               embedding: np.ndarray,
+               top_k: int,
+               tau: float = 0.95) -> Optional[Dict[str, Any]]:
+        """Return a cached response for a query within cosine tau, if any"""
+        with self._lock:
+            if self.index.ntotal == 0:
+                return None
+
+            k = min(self.candidates, self.index.ntotal)
+            scores, ids = self.index.search(embedding.reshape(1, -1), k)
+
+            now = time.monotonic()
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or score < tau:
+                    break
+
+                entry_top_k, response, sources, timestamp = self.entries[int(entry_id)]
+                if now - timestamp > self.ttl_seconds:
+                    self._evict(int(entry_id))
+                    continue
+                if entry_top_k != top_k:
+                    continue
+
+                self.entries.move_to_end(int(entry_id))
+                return {'response': response, 'sources': sources}
+
+            return None
+
+    def insert(self,
+               embedding: np.ndarray,
+               top_k: int,
+               response: str,
+               sources: List[dict]):
+        """Cache the response for a query embedding"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+
+            self.index.add_with_ids(embedding.reshape(1, -1), np.array([entry_id], dtype=np.int64))
+            self.entries[entry_id] = (top_k, response, sources, time.monotonic())
+
+            while len(self.entries) > self.max_entries:
+                self._evict(next(iter(self.entries)))
+
+    def invalidate(self):
+        """Drop every cached response (the underlying documents changed)"""
+        with self._lock:
+            self.index.reset()
+            self.entries.clear()
+            logger.info("Invalidated semantic query cache")
+
+    def _evict(self, entry_id: int):
+        self.index.remove_ids(np.array([entry_id], dtype=np.int64))
+        self.entries.pop(entry_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the cache"""
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds
+        }
@@ -1,6 +1,10 @@
 @echo off
 REM RAG Knowledge Base - Quick Start Script for Windows
 
+REM Pass --clean to rebuild images without the layer cache
+set BUILD_ARGS=
+if /i "%~1"=="--clean" set BUILD_ARGS=--no-cache
+
 echo.
 echo 🔍 RAG Knowledge Base - Quick Start
 echo ==================================
@@ -23,54 +27,115 @@ if errorlevel 1 (
     exit /b 1
 )
 
-REM Create .env file if it doesn't exist
-if not exist .env (
-    echo 📝 Creating environment file...
-    copy .env.template .env
-    echo ✅ Created .env file from template
-    echo 💡 You can edit .env to add your OpenAI API key optional
+REM The healthchecks use start_interval, which Compose only parses from v2.20
+set COMPOSE_MAJOR=0
+set COMPOSE_MINOR=0
+for /f "tokens=1,2 delims=v." %%a in ('docker-compose version --short 2^>nul') do (
+    set COMPOSE_MAJOR=%%a
+    set COMPOSE_MINOR=%%b
+)
+set COMPOSE_TOO_OLD=
+if %COMPOSE_MAJOR% lss 2 set COMPOSE_TOO_OLD=1
+if %COMPOSE_MAJOR% equ 2 if %COMPOSE_MINOR% lss 20 set COMPOSE_TOO_OLD=1
+if defined COMPOSE_TOO_OLD (
+    echo ❌ Docker Compose is too old; version 2.20 or newer is required:
+    echo    https://docs.docker.com/compose/install/
+    pause
+    exit /b 1
 )
 
-REM Create necessary directories
-echo 📁 Creating directories...
-if not exist uploads mkdir uploads
-if not exist data mkdir data
-if not exist logs mkdir logs
-echo ✅ Directories created
+REM Create .env file and necessary directories (shared with start.sh);
+REM fall back to cmd when no Python is installed on the host
+python bootstrap.py 2>nul
+if errorlevel 1 (
+    if not exist .env copy .env.template .env >nul
+    for %%d in (uploads data logs) do if not exist %%d mkdir %%d
+    echo ✅ Directories created
+)
+
+REM Skip the teardown and rebuild when nothing that goes into the images or their
+REM environment (.env) changed and the stack is still running
+set HASH=
+set HASH_INPUT=%TEMP%\rag-start-hash-input.tmp
+copy /b docker-compose.yml+Dockerfile+requirements.txt+nginx.conf+frontend.html+.env+*.py "%HASH_INPUT%" >nul 2>&1
+for /f "skip=1 delims=" %%h in ('certutil -hashfile "%HASH_INPUT%" SHA256') do if not defined HASH set HASH=%%h
+del "%HASH_INPUT%" >nul 2>&1
+set CACHED_HASH=
+if exist .start-cache-hash set /p CACHED_HASH=<.start-cache-hash
+if not defined BUILD_ARGS if defined HASH if "%CACHED_HASH%"=="%HASH%" (
+    docker-compose ps --services --filter "status=running" 2>nul | findstr /x rag-api >nul
+    if not errorlevel 1 (
+        echo ✅ Stack already up and up-to-date; skipping rebuild.
+        echo 🌐 Web Interface:      http://localhost
+        exit /b 0
+    )
+)
+if exist .start-cache-hash del .start-cache-hash
 
 REM Build and start the services
 echo 🚀 Building and starting services...
 docker-compose down --remove-orphans >nul 2>&1
-docker-compose build --no-cache
-docker-compose up -d
+REM BuildKit reuses cached layers, so dependencies reinstall only when requirements.txt changes;
+REM --parallel builds services side by side when more than one has a build context
+set DOCKER_BUILDKIT=1
+set COMPOSE_DOCKER_CLI_BUILD=1
+docker-compose build --parallel %BUILD_ARGS%
 
-REM Wait for services to be ready
+REM Wait for services to be ready: compose returns once every healthcheck
+REM passes (probed each second while starting), then the probes below confirm
 echo ⏳ Waiting for services to start...
-timeout /t 10 /nobreak >nul
-
-REM Check if services are healthy
-echo 🔍 Checking service health...
-curl -s http://localhost:8000/health >nul 2>&1
+docker-compose up -d --wait --wait-timeout 90
 if errorlevel 1 (
-    echo ❌ Backend service failed to start
+    echo ❌ Services failed to become healthy
     echo 📋 Checking logs:
-    docker-compose logs rag-api
+    docker-compose logs rag-api nginx
     pause
     exit /b 1
 )
+echo 🔍 Checking service health...
+set ATTEMPTS=0
+:wait_backend
+curl -sfI http://localhost:8000/health >nul 2>&1
+if not errorlevel 1 goto backend_ready
+set /a ATTEMPTS+=1
+if %ATTEMPTS% geq 120 goto backend_failed
+REM Half-second delay (ping -w is unreliable: it returns at once when there is no route)
+powershell -NoProfile -Command Start-Sleep -Milliseconds 500
+goto wait_backend
+
+:backend_failed
+echo ❌ Backend service failed to start
+echo 📋 Checking logs:
+docker-compose logs rag-api
+pause
+exit /b 1
+
+:backend_ready
 echo ✅ Backend service is healthy
 
 REM Check if frontend is accessible
-curl -s http://localhost >nul 2>&1
-if errorlevel 1 (
-    echo ❌ Frontend service is not accessible
-    echo 📋 Checking logs:
-    docker-compose logs nginx
-    pause
-    exit /b 1
-)
+set ATTEMPTS=0
+:wait_frontend
+curl -sfI http://localhost >nul 2>&1
+if not errorlevel 1 goto frontend_ready
+set /a ATTEMPTS+=1
+if %ATTEMPTS% geq 120 goto frontend_failed
+powershell -NoProfile -Command Start-Sleep -Milliseconds 500
+goto wait_frontend
+
+:frontend_failed
+echo ❌ Frontend service is not accessible
+echo 📋 Checking logs:
+docker-compose logs nginx
+pause
+exit /b 1
+
+:frontend_ready
 echo ✅ Frontend service is healthy
 
+REM Remember what this stack was built from
+if defined HASH echo %HASH%> .start-cache-hash
+
 echo.
 echo 🎉 RAG Knowledge Base is now running!
 echo ==================================
@@ -5,6 +5,12 @@
 
 set -e
 
+# Pass --clean to rebuild images without the layer cache
+BUILD_ARGS=""
+if [ "$1" = "--clean" ]; then
+    BUILD_ARGS="--no-cache"
+fi
+
 echo "🔍 RAG Knowledge Base - Quick Start"
 echo "=================================="
 
@@ -22,47 +28,90 @@ if ! command -v docker-compose &> /dev/null; then
     exit 1
 fi
 
-# Create .env file if it doesn't exist
-if [ ! -f .env ]; then
-    echo "📝 Creating environment file..."
-    cp .env.template .env
-    echo "✅ Created .env file from template"
-    echo "💡 You can edit .env to add your OpenAI API key (optional)"
+# The healthchecks use start_interval, which Compose only parses from v2.20
+COMPOSE_VERSION=$(docker-compose version --short 2>/dev/null | sed 's/^v//')
+IFS=. read -r COMPOSE_MAJOR COMPOSE_MINOR _ <<< "$COMPOSE_VERSION"
+if (( ${COMPOSE_MAJOR:-0} < 2 || (${COMPOSE_MAJOR:-0} == 2 && ${COMPOSE_MINOR:-0} < 20) )); then
+    echo "❌ Docker Compose ${COMPOSE_VERSION:-unknown} is too old; version 2.20 or newer is required:"
+    echo "   https://docs.docker.com/compose/install/"
+    exit 1
 fi
 
-# Create necessary directories
-echo "📁 Creating directories..."
-mkdir -p uploads data logs
-echo "✅ Directories created"
+# Poll a URL until it answers: every 0.2s for the first 5s, then every second, for up to 60s
+wait_for() {
+    local url=$1
+    local start=$SECONDS
+    local deadline=$((SECONDS + 60))
+    while (( SECONDS < deadline )); do
+        # HEAD only: readiness needs the status, not the body
+        if curl -sfI "$url" > /dev/null 2>&1; then
+            return 0
+        fi
+        if (( SECONDS - start < 5 )); then
+            sleep 0.2
+        else
+            sleep 1
+        fi
+    done
+    return 1
+}
+
+# Create .env file and necessary directories (shared with start.bat);
+# fall back to the shell when no Python is installed on the host
+if command -v python3 &> /dev/null; then
+    python3 bootstrap.py
+elif command -v python &> /dev/null; then
+    python bootstrap.py
+else
+    [ -f .env ] || { cp .env.template .env && echo "✅ Created .env file from template"; }
+    mkdir -p uploads data logs
+    echo "✅ Directories created"
+fi
+
+# Skip the teardown and rebuild when nothing that goes into the images or their
+# environment (.env) changed and the stack is still running
+HASH_FILE=.start-cache-hash
+HASH=$(cat docker-compose.yml Dockerfile requirements.txt nginx.conf frontend.html .env *.py 2>/dev/null \
+    | { sha256sum 2>/dev/null || shasum -a 256; } | cut -d' ' -f1)
+if [ -z "$BUILD_ARGS" ] && [ -f "$HASH_FILE" ] && [ "$(cat "$HASH_FILE")" = "$HASH" ] \
+    && docker-compose ps --services --filter "status=running" 2>/dev/null | grep -qx rag-api; then
+    echo "✅ Stack already up and up-to-date; skipping rebuild."
+    echo "🌐 Web Interface:    http://localhost"
+    exit 0
+fi
+rm -f "$HASH_FILE"
 
 # Build and start the services
 echo "🚀 Building and starting services..."
 docker-compose down --remove-orphans 2>/dev/null || true
-docker-compose build --no-cache
-docker-compose up -d
+# BuildKit reuses cached layers, so dependencies reinstall only when requirements.txt changes;
+# --parallel builds services side by side when more than one has a build context
+export DOCKER_BUILDKIT=1
+export COMPOSE_DOCKER_CLI_BUILD=1
+docker-compose build --parallel $BUILD_ARGS
 
 # Wait for services to be ready
 echo "⏳ Waiting for services to start..."
-sleep 10
+# Returns once every healthcheck passes (probed each second while starting)
+if ! docker-compose up -d --wait --wait-timeout 90; then
+    echo "❌ Services failed to become healthy"
+    echo "📋 Checking logs:"
+    docker-compose logs rag-api nginx
+    exit 1
+fi
 
-# Check if services are healthy
 echo "🔍 Checking service health..."
-for i in {1..30}; do
-    if curl -s http://localhost:8000/health > /dev/null 2>&1; then
-        echo "✅ Backend service is healthy"
-        break
-    fi
-    if [ $i -eq 30 ]; then
-        echo "❌ Backend service failed to start"
-        echo "📋 Checking logs:"
-        docker-compose logs rag-api
-        exit 1
-    fi
-    sleep 2
-done
+if wait_for http://localhost:8000/health; then
+    echo "✅ Backend service is healthy"
+else
+    echo "❌ Backend service failed to start"
+    echo "📋 Checking logs:"
+    docker-compose logs rag-api
+    exit 1
+fi
 
 # Check if frontend is accessible
-if curl -s http://localhost > /dev/null 2>&1; then
+if wait_for http://localhost; then
     echo "✅ Frontend service is healthy"
 else
     echo "❌ Frontend service is not accessible"
@@ -71,6 +120,9 @@ else
     exit 1
 fi
 
+# Remember what this stack was built from
+echo "$HASH" > "$HASH_FILE"
+
 echo ""
 echo "🎉 RAG Knowledge Base is now running!"
 echo "=================================="
@@ -0,0 +1,22 @@
+from document_processor import fast_split
+
+
+def test_fast_split_hard_cuts_before_unbreakable_run():
+    """A long token without breaks must not make each window advance by one word"""
+    text = "word " * 50 + "z" * 1500
+
+    chunks = fast_split(text, chunk_size=1000, chunk_overlap=200)
+
+    assert [len(chunk) for chunk in chunks] == [249, 999, 501]
+    assert "".join(chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_fast_split_keeps_overlap_for_full_windows():
+    """Windows cut in their second half still repeat the overlap"""
+    text = " ".join(f"w{i}" for i in range(400))
+
+    chunks = fast_split(text, chunk_size=1000, chunk_overlap=200)
+
+    assert len(chunks) == 3
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert chunks[1].split()[0] in chunks[0].split()
@@ -6,36 +6,60 @@ Tests basic functionality without requiring external dependencies
 
 import asyncio
 import aiohttp
-import json
+import io
+import orjson
+import textwrap
 import time
-from pathlib import Path
 
 BASE_URL = "http://localhost:8000"
 
-async def test_health_check():
-    """Test if the API is responding"""
-    print("🔍 Testing health check...")
+async def wait_ready(session, deadline=30.0):
+    """Poll the health endpoint with HEAD and backoff, returning (ready: bool, last_error)"""
+    start = time.monotonic()
+    delay = 0.1
+    last_error = None
 
-    async with aiohttp.ClientSession() as session:
+    while time.monotonic() - start < deadline:
         try:
-            async with session.get(f"{BASE_URL}/health") as response:
+            async with session.head(f"{BASE_URL}/health", timeout=aiohttp.ClientTimeout(total=1)) as response:
                 if response.status == 200:
-                    data = await response.json()
-                    print(f"✅ Health check passed: {data}")
-                    return True
-                else:
-                    print(f"❌ Health check failed with status {response.status}")
-                    return False
+                    return True, None
+                last_error = f"status {response.status}"
         except Exception as e:
-            print(f"❌ Health check failed: {e}")
+            last_error = e
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+    return False, last_error
+
+async def test_health_check(session):
+    """Test if the API is responding, waiting for it to become ready"""
+    print("🔍 Testing health check...")
+
+    ready, error = await wait_ready(session)
+    if not ready:
+        print(f"❌ Health check failed: {error}")
+        return False
+
+    # Verify the full response shape once the server is up
+    try:
+        async with session.get(f"{BASE_URL}/health") as response:
+            data = await response.json(loads=orjson.loads)
+            if response.status == 200 and data.get("status") == "healthy":
+                print(f"✅ Health check passed: {data}")
+                return True
+            print(f"❌ Health check failed with status {response.status}: {data}")
             return False
+    except Exception as e:
+        print(f"❌ Health check failed: {e}")
+        return False
 
-async def test_document_upload():
+async def test_document_upload(session):
     """Test document upload functionality"""
     print("📄 Testing document upload...")
 
-    # Create a test document
-    test_doc_path = Path("test_document.txt")
+    # Test document, uploaded straight from memory
     test_content = """
     This is a test document for the RAG system.
 
@@ -56,120 +80,120 @@ async def test_document_upload():
     This allows for semantic search and intelligent question answering.
     """
 
-    with open(test_doc_path, 'w') as f:
-        f.write(test_content)
+    try:
+        # Streamed multipart body: the payload is read from the file object in chunks
+        writer = aiohttp.MultipartWriter('form-data')
+        part = writer.append(io.BytesIO(test_content.encode('utf-8')), {'Content-Type': 'text/plain'})
+        part.set_content_disposition('form-data', name='file', filename='test_document.txt')
+
+        async with session.post(f"{BASE_URL}/upload", data=writer) as response:
+            if response.status == 200:
+                data = await response.json()
+                print(f"✅ Document upload successful: {data}")
+                return data.get('doc_id')
+            else:
+                error_data = await response.text()
+                print(f"❌ Document upload failed with status {response.status}: {error_data}")
+                return None
+    except Exception as e:
+        print(f"❌ Document upload failed: {e}")
+        return None
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            with open(test_doc_path, 'rb') as file:
-                form_data = aiohttp.FormData()
-                form_data.add_field('file', file, filename='test_document.txt', content_type='text/plain')
-
-                async with session.post(f"{BASE_URL}/upload", data=form_data) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Document upload successful: {data}")
-                        return data.get('doc_id')
-                    else:
-                        error_data = await response.text()
-                        print(f"❌ Document upload failed with status {response.status}: {error_data}")
-                        return None
-        except Exception as e:
-            print(f"❌ Document upload failed: {e}")
-            return None
-        finally:
-            # Clean up test file
-            if test_doc_path.exists():
-                test_doc_path.unlink()
-
-async def test_query():
+async def test_query(session):
     """Test query functionality"""
     print("❓ Testing query...")
 
     test_query = "What is this document about?"
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            query_data = {
-                "query": test_query,
-                "top_k": 3
-            }
-
-            headers = {"Content-Type": "application/json"}
-
-            async with session.post(f"{BASE_URL}/query", 
-                                  data=json.dumps(query_data), 
-                                  headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print(f"✅ Query successful!")
-                    print(f"📝 Response: {data['response'][:200]}...")
-                    print(f"📚 Found {len(data['sources'])} sources")
-                    return True
-                else:
-                    error_data = await response.text()
-                    print(f"❌ Query failed with status {response.status}: {error_data}")
-                    return False
-        except Exception as e:
-            print(f"❌ Query failed: {e}")
-            return False
+    try:
+        query_data = {
+            "query": test_query,
+            "top_k": 3,
+            "max_chars": 256  # Only a preview is printed
+        }
+
+        headers = {"Content-Type": "application/json"}
+
+        async with session.post(f"{BASE_URL}/query", 
+                              data=orjson.dumps(query_data), 
+                              headers=headers) as response:
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                print(f"✅ Query successful!")
+                print(f"📝 Response: {textwrap.shorten(data['response'], width=200, placeholder='...')}")
+                print(f"📚 Found {len(data['sources'])} sources")
+                return True
+            else:
+                error_data = await response.text()
+                print(f"❌ Query failed with status {response.status}: {error_data}")
+                return False
+    except Exception as e:
+        print(f"❌ Query failed: {e}")
+        return False
 
-async def test_list_documents():
+async def test_list_documents(session):
     """Test document listing"""
     print("📋 Testing document listing...")
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(f"{BASE_URL}/documents") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print(f"✅ Document listing successful: Found {len(data)} documents")
-                    return data
-                else:
-                    error_data = await response.text()
-                    print(f"❌ Document listing failed with status {response.status}: {error_data}")
-                    return None
-        except Exception as e:
-            print(f"❌ Document listing failed: {e}")
-            return None
+    try:
+        async with session.get(f"{BASE_URL}/documents") as response:
+            if response.status == 200:
+                data = await response.json()
+                print(f"✅ Document listing successful: Found {len(data)} documents")
+                return data
+            else:
+                error_data = await response.text()
+                print(f"❌ Document listing failed with status {response.status}: {error_data}")
+                return None
+    except Exception as e:
+        print(f"❌ Document listing failed: {e}")
+        return None
+
+async def test_upload_and_query(session):
+    """Upload the test document, then query it if the upload succeeded"""
+    doc_id = await test_document_upload(session)
+    if not doc_id:
+        print("⏭️ Skipping query test (upload failed)")
+        return None, False
+    return doc_id, await test_query(session)
 
 async def run_all_tests():
     """Run all tests"""
     print("🚀 Starting RAG Knowledge Base Tests")
     print("=" * 50)
 
-    # Wait a moment for system to be ready
-    print("⏳ Waiting for system to be ready...")
-    await asyncio.sleep(2)
-
     tests_passed = 0
     total_tests = 4
 
-    # Test 1: Health check
-    if await test_health_check():
-        tests_passed += 1
-
-    print()
+    # One pooled session for every request (reuses TCP connections and DNS)
+    connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # Test 1: Health check, retried until the system is ready
+        print("⏳ Waiting for system to be ready...")
+        if await test_health_check(session):
+            tests_passed += 1
 
-    # Test 2: Document upload
-    doc_id = await test_document_upload()
-    if doc_id:
-        tests_passed += 1
+        print()
 
-    print()
+        # Listing doesn't depend on the upload, so run it alongside the
+        # upload -> query chain (structured concurrency on Python 3.11+)
+        if hasattr(asyncio, "TaskGroup"):
+            async with asyncio.TaskGroup() as tg:
+                list_task = tg.create_task(test_list_documents(session))
+                chain_task = tg.create_task(test_upload_and_query(session))
+            documents, (doc_id, query_ok) = list_task.result(), chain_task.result()
+        else:
+            documents, (doc_id, query_ok) = await asyncio.gather(
+                test_list_documents(session), test_upload_and_query(session))
 
-    # Test 3: Query (only if upload succeeded)
-    if doc_id:
-        if await test_query():
+        if doc_id:
+            tests_passed += 1
+        if query_ok:
+            tests_passed += 1
+        # An empty list is a valid listing
+        if isinstance(documents, list):
             tests_passed += 1
-    else:
-        print("⏭️ Skipping query test (upload failed)")
-
-    print()
-
-    # Test 4: List documents
-    if await test_list_documents():
-        tests_passed += 1
 
     print()
     print("=" * 50)